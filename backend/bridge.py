@@ -1,8 +1,12 @@
 # backend/bridge.py
 import asyncio
+import json
+import os
+import re
 import time
 import logging
-from typing import Set
+from typing import Dict, Optional, Set
+from urllib.parse import urlsplit, parse_qs
 import websockets
 from websockets.exceptions import ConnectionClosedOK, ConnectionClosedError
 
@@ -15,32 +19,117 @@ LOGGER = logging.getLogger("bridge")
 HOST = "0.0.0.0"
 PORT = 8765
 TICK_RATE = 30.0  # Hz
-
-world = WorldState()
-clients: Set[websockets.WebSocketServerProtocol] = set()
-
-async def send_world_state(client: websockets.WebSocketServerProtocol) -> None:
-    msg = encode_message(MessageType.WORLD_STATE, world.to_dict())
+DEFAULT_ROOM = "lobby"
+IDLE_TIMEOUT = 300.0  # seconds an empty room is kept before eviction
+ROOM_DIR = "rooms"
+
+ROOM_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Room:
+    """
+    One independent world with its own clients and its own tick task,
+    which only runs while the room is occupied
+    """
+
+    def __init__(self, name: str, world: Optional[WorldState] = None):
+        self.name = name
+        self.world = world or WorldState()
+        self.clients: Set[websockets.WebSocketServerProtocol] = set()
+        self.idle_since: Optional[float] = time.monotonic()
+        self.tick_task: Optional[asyncio.Task] = None
+
+    def resume(self) -> None:
+        if self.tick_task is None:
+            self.tick_task = asyncio.create_task(room_loop(self))
+
+    def suspend(self) -> None:
+        if self.tick_task is not None:
+            self.tick_task.cancel()
+            self.tick_task = None
+        self.idle_since = time.monotonic()
+
+
+rooms: Dict[str, Room] = {}
+
+def room_path(name: str) -> str:
+    return os.path.join(ROOM_DIR, f"{name}.json")
+
+def get_room(name: str) -> Room:
+    """
+    Return a live room, resuming it from disk if it was evicted
+    """
+    room = rooms.get(name)
+    if room is None:
+        world = None
+        if os.path.exists(room_path(name)):
+            with open(room_path(name), "r", encoding="utf-8") as f:
+                world = WorldState.from_dict(json.load(f))
+            LOGGER.info("Room %s resumed from disk", name)
+        room = rooms[name] = Room(name, world)
+    return room
+
+def evict_idle_rooms() -> None:
+    now = time.monotonic()
+    for name, room in list(rooms.items()):
+        if room.clients or now - room.idle_since < IDLE_TIMEOUT:
+            continue
+        os.makedirs(ROOM_DIR, exist_ok=True)
+        # Write then rename, so a crash mid-dump never leaves a truncated room
+        tmp_path = room_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(room.world.to_dict(), f)
+        os.replace(tmp_path, room_path(name))
+        del rooms[name]
+        LOGGER.info("Room %s evicted to disk", name)
+
+def requested_room(ws: websockets.WebSocketServerProtocol) -> str:
+    """
+    Room chosen at handshake: ws://host:port/<room> or ?room=<room>
+    """
+    path = getattr(ws, "path", None)
+    if path is None:
+        path = ws.request.path
+    url = urlsplit(path)
+    query_room = parse_qs(url.query).get("room")
+    if query_room:
+        return query_room[0]
+    return url.path.strip("/") or DEFAULT_ROOM
+
+async def send_world_state(room: Room, client: websockets.WebSocketServerProtocol) -> None:
+    # Always a full snapshot, also on reconnect: the game loop rebroadcasts the
+    # full world at TICK_RATE anyway, so a diff-since-version catch-up would be
+    # superseded by the next frame and save nothing (see server/rooms.py for it)
+    msg = encode_message(MessageType.WORLD_STATE, room.world.to_dict())
     await client.send(msg)
 
-async def broadcast_world_state() -> None:
-    if not clients:
+async def broadcast_world_state(room: Room) -> None:
+    if not room.clients:
         return
-    msg = encode_message(MessageType.WORLD_STATE, world.to_dict())
+    msg = encode_message(MessageType.WORLD_STATE, room.world.to_dict())
     await asyncio.gather(
-        *(c.send(msg) for c in clients),
+        *(c.send(msg) for c in room.clients),
         return_exceptions=True
     )
 
 async def handle_client(ws: websockets.WebSocketServerProtocol) -> None:
-    clients.add(ws)
-    LOGGER.info("Client connected. total=%d", len(clients))
+    room_name = requested_room(ws)
+    if not ROOM_NAME.match(room_name):
+        await ws.send(encode_message(MessageType.ERROR, {"reason": "bad_room"}))
+        await ws.close()
+        return
 
-    # Send initial hello + state
-    await ws.send(encode_message(MessageType.HELLO, {"msg": "Welcome to T-R-A-V-I core"}))
-    await send_world_state(ws)
+    room = get_room(room_name)
+    room.clients.add(ws)
+    room.idle_since = None
+    room.resume()
+    LOGGER.info("Client connected to room %s. total=%d", room.name, len(room.clients))
 
     try:
+        # Send initial hello + state
+        await ws.send(encode_message(MessageType.HELLO, {"msg": "Welcome to T-R-A-V-I core", "room": room.name}))
+        await send_world_state(room, ws)
+
         async for raw in ws:
             try:
                 msg = decode_message(raw)
@@ -56,8 +145,8 @@ async def handle_client(ws: websockets.WebSocketServerProtocol) -> None:
                 await ws.send(encode_message(MessageType.PONG, {"ts": time.time()}))
 
             elif msg_type == MessageType.CLIENT_INPUT:
-                # Forward to world state
-                world.apply_input(payload)
+                # Forward to this room's world state
+                room.world.apply_input(payload)
 
             else:
                 LOGGER.info("Unhandled message type from client: %s", msg_type)
@@ -65,25 +154,38 @@ async def handle_client(ws: websockets.WebSocketServerProtocol) -> None:
     except (ConnectionClosedOK, ConnectionClosedError):
         LOGGER.info("Client disconnected.")
     finally:
-        clients.discard(ws)
-        LOGGER.info("Client removed. total=%d", len(clients))
-
-async def game_loop() -> None:
+        room.clients.discard(ws)
+        if not room.clients:
+            room.suspend()
+        LOGGER.info("Client removed from room %s. total=%d", room.name, len(room.clients))
+
+async def room_loop(room: Room) -> None:
+    """
+    Tick one room, so a busy world never delays the others' frames
+    """
     last = time.time()
     while True:
         now = time.time()
         dt = now - last
         last = now
 
-        world.update(dt)
-        await broadcast_world_state()
+        try:
+            room.world.update(dt)
+            await broadcast_world_state(room)
+        except Exception:
+            LOGGER.exception("Tick failed in room %s", room.name)
 
         await asyncio.sleep(max(0.0, (1.0 / TICK_RATE) - (time.time() - now)))
 
+async def janitor_loop() -> None:
+    while True:
+        evict_idle_rooms()
+        await asyncio.sleep(IDLE_TIMEOUT / 4)
+
 async def main() -> None:
     LOGGER.info("Starting WebSocket server on %s:%d", HOST, PORT)
     async with websockets.serve(handle_client, HOST, PORT):
-        await game_loop()
+        await janitor_loop()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -75,3 +75,14 @@ class WorldState:
             "frame_count": self.frame_count,
             "entities": self.entities
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WorldState":
+        """
+        Rebuild a world serialized with to_dict (e.g. a room resumed from disk)
+        """
+        world = cls()
+        world.time = data.get("time", 0.0)
+        world.frame_count = data.get("frame_count", 0)
+        world.entities = data.get("entities", {})
+        return world
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Benchmark command validation against the full command path"""
+import timeit
+from world_state import WorldState
+from command_router import CommandRouter
+from schema import COMMAND_VALIDATORS
+
+ITERATIONS = 20000
+
+SAMPLE_PARAMS = {
+    "spawn_entity": {
+        "entity_id": "bench_player",
+        "type": "player",
+        "position": [0, 1, 0],
+        "rotation": [0, 0, 0],
+        "scale": [1, 1, 1],
+        "color": [1, 0, 0, 1],
+        "stats": {"health": 100, "mana": 50}
+    },
+    "move_entity": {"entity_id": "bench_player", "position": [2.5, 1, -3]},
+    "set_color": {"entity_id": "bench_player", "color": [0, 1, 0, 1]}
+}
+
+
+def bench_command():
+    router = CommandRouter(WorldState())
+    router.route_command("spawn_entity", SAMPLE_PARAMS["spawn_entity"])
+
+    print(f"{'command':<16}{'validate (us)':>16}{'route (us)':>14}{'share':>8}")
+    for command, params in SAMPLE_PARAMS.items():
+        validate = COMMAND_VALIDATORS[command]
+        validate_time = timeit.timeit(lambda: validate(params), number=ITERATIONS)
+        route_time = timeit.timeit(lambda: router.route_command(command, params), number=ITERATIONS)
+        validate_us = validate_time / ITERATIONS * 1e6
+        route_us = route_time / ITERATIONS * 1e6
+        print(f"{command:<16}{validate_us:>16.2f}{route_us:>14.2f}{validate_us / route_us:>8.1%}")
+
+
+if __name__ == "__main__":
+    bench_command()
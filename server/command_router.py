@@ -2,7 +2,9 @@
 import logging
 from typing import Dict, Any, Optional
 from world_state import WorldState
-from messages import create_event_message
+from world_history import WorldHistory
+from messages import create_event_message, create_state_message
+from schema import COMMAND_VALIDATORS
 
 logger = logging.getLogger(__name__)
 
@@ -10,17 +12,32 @@ logger = logging.getLogger(__name__)
 class CommandRouter:
     """Routes and executes commands on the world state"""
     
+    # Commands whose effect is recorded in the undo history
+    EDIT_COMMANDS = frozenset({"spawn_entity", "move_entity", "set_color", "delete_entity"})
+    
     def __init__(self, world_state: WorldState):
         self.world_state = world_state
+        self.history = WorldHistory(world_state)
         self.handlers = {
             "spawn_entity": self._handle_spawn_entity,
             "move_entity": self._handle_move_entity,
             "set_color": self._handle_set_color,
-            "delete_entity": self._handle_delete_entity
+            "delete_entity": self._handle_delete_entity,
+            "undo": self._handle_undo,
+            "redo": self._handle_redo,
+            "create_checkpoint": self._handle_create_checkpoint,
+            "restore_checkpoint": self._handle_restore_checkpoint,
+            "create_branch": self._handle_create_branch,
+            "switch_branch": self._handle_switch_branch
         }
+        # Fails at startup if a command has no schema
+        self.validators = {command: COMMAND_VALIDATORS[command] for command in self.handlers}
         
     def route_command(self, command: str, params: Dict[str, Any]) -> Optional[str]:
-        """Route a command to its handler and return an event message if successful"""
+        """Route a command to its handler and return an event message if successful
+
+        Raises ValueError with a client-facing reason when params are invalid.
+        """
         logger.info(f"Routing command: {command} with params: {params}")
         
         if command not in self.handlers:
@@ -28,52 +45,107 @@ class CommandRouter:
             return None
             
         try:
-            return self.handlers[command](params)
+            params = self._resolve_handle(command, params)
+            self.validators[command](params)
+            before = self.world_state.snapshot()
+            result = self.handlers[command](params)
+            if command in self.EDIT_COMMANDS:
+                self.history.record(before)
+            return result
+        except ValueError as e:
+            # Invalid params: let the caller report the reason to the client
+            logger.warning(f"Rejected command {command}: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error executing command {command}: {e}")
             return None
             
+    def _resolve_handle(self, command: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Accept an integer handle in place of entity_id"""
+        if "entity_id" in params or "handle" not in params:
+            return params
+        if command == "spawn_entity":
+            # Handles name existing entities; spawning by one would overwrite it
+            raise ValueError("spawn_entity requires entity_id, not handle")
+        handle = params["handle"]
+        entity_id = self.world_state.entity_id_for(handle) if type(handle) is int else None
+        if entity_id is None:
+            raise ValueError(f"Unknown entity handle: {handle}")
+        return dict(params, entity_id=entity_id)
+        
     def _handle_spawn_entity(self, params: Dict[str, Any]) -> str:
         """Handle spawn_entity command"""
-        entity_id = params.get("entity_id")
-        if not entity_id:
-            raise ValueError("entity_id is required")
-            
-        entity = self.world_state.spawn_entity(entity_id, params)
-        return create_event_message("entity_spawned", entity)
+        entity = self.world_state.spawn_entity(params["entity_id"], params)
+        return self._event_message("entity_spawned", entity)
         
     def _handle_move_entity(self, params: Dict[str, Any]) -> Optional[str]:
         """Handle move_entity command"""
-        entity_id = params.get("entity_id")
-        position = params.get("position")
-        
-        if not entity_id or position is None:
-            raise ValueError("entity_id and position are required")
-            
-        entity = self.world_state.move_entity(entity_id, position)
+        entity = self.world_state.move_entity(params["entity_id"], params["position"])
         if entity:
-            return create_event_message("entity_updated", entity)
+            return self._event_message("entity_updated", entity)
         return None
         
     def _handle_set_color(self, params: Dict[str, Any]) -> Optional[str]:
         """Handle set_color command"""
-        entity_id = params.get("entity_id")
-        color = params.get("color")
-        
-        if not entity_id or color is None:
-            raise ValueError("entity_id and color are required")
-            
-        entity = self.world_state.set_color(entity_id, color)
+        entity = self.world_state.set_color(params["entity_id"], params["color"])
         if entity:
-            return create_event_message("entity_updated", entity)
+            return self._event_message("entity_updated", entity)
         return None
         
     def _handle_delete_entity(self, params: Dict[str, Any]) -> Optional[str]:
         """Handle delete_entity command"""
-        entity_id = params.get("entity_id")
-        if not entity_id:
-            raise ValueError("entity_id is required")
-            
+        entity_id = params["entity_id"]
         if self.world_state.delete_entity(entity_id):
-            return create_event_message("entity_deleted", {"entity_id": entity_id})
+            return self._event_message("entity_deleted", {"entity_id": entity_id})
+        return None
+        
+    def _state_message(self) -> str:
+        """Full STATE message for commands that replace the whole world"""
+        return create_state_message(
+            self.world_state.get_all_entities(),
+            self.world_state.version,
+            self.world_state.epoch
+        )
+        
+    def _event_message(self, event_type: str, data: Dict[str, Any]) -> str:
+        """EVENT message tagged with the world version it produced"""
+        return create_event_message(event_type, data, self.world_state.version)
+        
+    def _handle_undo(self, params: Dict[str, Any]) -> Optional[str]:
+        """Handle undo command"""
+        if self.history.undo():
+            return self._state_message()
+        return None
+        
+    def _handle_redo(self, params: Dict[str, Any]) -> Optional[str]:
+        """Handle redo command"""
+        if self.history.redo():
+            return self._state_message()
+        return None
+        
+    def _handle_create_checkpoint(self, params: Dict[str, Any]) -> str:
+        """Handle create_checkpoint command"""
+        name = params["name"]
+        snapshot = self.history.create_checkpoint(name)
+        return self._event_message("checkpoint_created", {"name": name, "version": snapshot.version})
+        
+    def _handle_restore_checkpoint(self, params: Dict[str, Any]) -> Optional[str]:
+        """Handle restore_checkpoint command"""
+        name = params["name"]
+        if self.history.restore_checkpoint(name):
+            return self._state_message()
+        return None
+        
+    def _handle_create_branch(self, params: Dict[str, Any]) -> Optional[str]:
+        """Handle create_branch command"""
+        name = params["name"]
+        if self.history.create_branch(name, params.get("checkpoint")):
+            return self._event_message("branch_created", {"name": name})
+        return None
+        
+    def _handle_switch_branch(self, params: Dict[str, Any]) -> Optional[str]:
+        """Handle switch_branch command"""
+        name = params["name"]
+        if self.history.switch_branch(name):
+            return self._state_message()
         return None
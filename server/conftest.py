@@ -0,0 +1,8 @@
+"""Pytest setup: server modules import each other as top-level modules"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Manual scripts that need a running server on localhost:8765
+collect_ignore = ["test_client.py", "test_errors.py"]
@@ -1,4 +1,5 @@
 """T-R-A-V-I Engine Server - Main Entry Point"""
+import argparse
 import asyncio
 import logging
 from ws_server import WebSocketServer
@@ -14,13 +15,20 @@ def setup_logging():
 
 def main():
     """Start the T-R-A-V-I engine server"""
+    parser = argparse.ArgumentParser(description="T-R-A-V-I engine server")
+    parser.add_argument("--record", metavar="PATH",
+                        help="append all inbound client traffic to PATH (see replay.py)")
+    args = parser.parse_args()
+    
     setup_logging()
     logger = logging.getLogger(__name__)
     
     logger.info("Initializing T-R-A-V-I Engine Server...")
     
     # Create and start WebSocket server
-    server = WebSocketServer(host="localhost", port=8765)
+    server = WebSocketServer(host="localhost", port=8765,
+                             room_dir="rooms",
+                             record_path=args.record)
     
     try:
         asyncio.run(server.start())
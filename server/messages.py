@@ -1,6 +1,6 @@
 """Message protocol definitions for WebSocket communication"""
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, List, Optional
 
 
 class MessageType:
@@ -10,6 +10,16 @@ class MessageType:
     STATE = "STATE"
     ERROR = "ERROR"
     PING = "PING"
+    VIEWPOINT = "VIEWPOINT"
+    CHUNKS = "CHUNKS"
+    DELTA = "DELTA"
+    HANDLES = "HANDLES"
+    UPDATE = "UPDATE"
+
+
+# Entity fields that compact UPDATE messages reference by index
+COMPACT_FIELDS = ("position", "rotation", "scale", "color")
+FIELD_CODES = {name: code for code, name in enumerate(COMPACT_FIELDS)}
 
 
 def create_message(msg_type: str, payload: Dict[str, Any]) -> str:
@@ -31,21 +41,76 @@ def parse_message(data: str) -> Dict[str, Any]:
         raise ValueError(f"Failed to parse message: {e}")
 
 
-def create_state_message(world_state: Dict[str, Any]) -> str:
+def create_state_message(world_state: Dict[str, Any], version: Optional[int] = None,
+                         epoch: Optional[str] = None) -> str:
     """Create a STATE message containing full world snapshot"""
-    return create_message(MessageType.STATE, {
-        "entities": world_state
-    })
+    payload = {"entities": world_state}
+    if version is not None:
+        payload["version"] = version
+        payload["epoch"] = epoch
+    return create_message(MessageType.STATE, payload)
 
 
-def create_event_message(event_type: str, data: Dict[str, Any]) -> str:
+def create_event_message(event_type: str, data: Dict[str, Any],
+                         version: Optional[int] = None) -> str:
     """Create an EVENT message"""
-    return create_message(MessageType.EVENT, {
+    payload = {
         "event_type": event_type,
         "data": data
+    }
+    if version is not None:
+        payload["version"] = version
+    return create_message(MessageType.EVENT, payload)
+
+
+def create_delta_message(delta: Dict[str, Any]) -> str:
+    """Create a DELTA message with the changes a reconnecting client missed"""
+    return create_message(MessageType.DELTA, delta)
+
+
+def create_chunks_message(batch: Dict[str, Any]) -> str:
+    """Create a CHUNKS message streaming procedural chunks to one client"""
+    return create_message(MessageType.CHUNKS, batch)
+
+
+def create_handles_message(handles: Dict[str, int]) -> str:
+    """Create a HANDLES message announcing entity id -> handle assignments"""
+    return create_message(MessageType.HANDLES, {
+        "fields": COMPACT_FIELDS,
+        "handles": handles
     })
 
 
+def create_update_message(version: int, updates: List[List[Any]]) -> str:
+    """Create a compact UPDATE message of [handle, field_code, value] entries"""
+    return json.dumps({
+        "type": MessageType.UPDATE,
+        "payload": {"v": version, "u": updates}
+    }, separators=(",", ":"))
+
+
+def encode_compact_updates(changes: Iterable[Any],
+                           handle_for: Callable[[str], int]) -> Optional[List[List[Any]]]:
+    """Encode (entity_id, old, new) changes as [handle, field_code, value] entries
+
+    Returns None when there is nothing to encode or when any change touched
+    more than the compact fields of an existing entity, so callers fall back
+    to the full message.
+    """
+    updates = []
+    for entity_id, old, new in changes:
+        if old is None or new is None or len(old) != len(new):
+            return None
+        for key, value in new.items():
+            if value is old.get(key):
+                continue
+            code = FIELD_CODES.get(key)
+            if code is None:
+                return None
+            updates.append([handle_for(entity_id), code, value])
+    return updates or None
+
+
 def create_error_message(error: str) -> str:
     """Create an ERROR message"""
     return create_message(MessageType.ERROR, {
@@ -0,0 +1,235 @@
+"""Persistent hash map with structural sharing
+
+A small hash array mapped trie. Every update returns a new map that shares
+all untouched nodes with the previous one, so keeping old versions around
+costs only the path that was rewritten (at most ~13 nodes of 32 slots).
+"""
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+_MISSING = object()
+
+
+class _Leaf:
+    """Key/value pairs sharing one full hash (more than one only on collision)"""
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, key_hash: int, pairs: Tuple[Tuple[Any, Any], ...]):
+        self.hash = key_hash
+        self.pairs = pairs
+
+
+class _Node:
+    """Interior trie node keyed by a 5-bit slice of the hash"""
+    __slots__ = ("children",)
+
+    def __init__(self, children: Dict[int, Any]):
+        self.children = children
+
+
+_EMPTY = _Node({})
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _split(a: _Leaf, b: _Leaf, shift: int) -> _Node:
+    """Build the smallest subtree holding two leaves with different hashes"""
+    index_a = (a.hash >> shift) & _MASK
+    index_b = (b.hash >> shift) & _MASK
+    if index_a == index_b:
+        return _Node({index_a: _split(a, b, shift + _BITS)})
+    return _Node({index_a: a, index_b: b})
+
+
+def _assoc(node: _Node, key_hash: int, key: Any, value: Any, shift: int) -> Tuple[_Node, bool]:
+    """Return (new node, whether a key was added)"""
+    index = (key_hash >> shift) & _MASK
+    child = node.children.get(index)
+    added = False
+
+    if child is None:
+        new_child = _Leaf(key_hash, ((key, value),))
+        added = True
+    elif isinstance(child, _Leaf):
+        if child.hash == key_hash:
+            pairs = list(child.pairs)
+            for i, (existing_key, existing_value) in enumerate(pairs):
+                if existing_key == key:
+                    if existing_value is value:
+                        return node, False
+                    pairs[i] = (key, value)
+                    break
+            else:
+                pairs.append((key, value))
+                added = True
+            new_child = _Leaf(key_hash, tuple(pairs))
+        else:
+            new_child = _split(child, _Leaf(key_hash, ((key, value),)), shift + _BITS)
+            added = True
+    else:
+        new_child, added = _assoc(child, key_hash, key, value, shift + _BITS)
+        if new_child is child:
+            return node, False
+
+    children = dict(node.children)
+    children[index] = new_child
+    return _Node(children), added
+
+
+def _dissoc(node: _Node, key_hash: int, key: Any, shift: int) -> _Node:
+    """Return a node without key, or the same node if key is absent"""
+    index = (key_hash >> shift) & _MASK
+    child = node.children.get(index)
+
+    if child is None:
+        return node
+    if isinstance(child, _Leaf):
+        if child.hash != key_hash:
+            return node
+        pairs = tuple(pair for pair in child.pairs if pair[0] != key)
+        if len(pairs) == len(child.pairs):
+            return node
+        new_child = _Leaf(key_hash, pairs) if pairs else None
+    else:
+        new_child = _dissoc(child, key_hash, key, shift + _BITS)
+        if new_child is child:
+            return node
+        # Collapse single-leaf subtrees so the trie stays shallow
+        if not new_child.children:
+            new_child = None
+        elif len(new_child.children) == 1:
+            only = next(iter(new_child.children.values()))
+            if isinstance(only, _Leaf):
+                new_child = only
+
+    children = dict(node.children)
+    if new_child is None:
+        del children[index]
+    else:
+        children[index] = new_child
+    return _Node(children)
+
+
+def _iter_pairs(node: _Node) -> Iterator[Tuple[Any, Any]]:
+    for child in node.children.values():
+        if isinstance(child, _Leaf):
+            yield from child.pairs
+        else:
+            yield from _iter_pairs(child)
+
+
+def _pairs(entry: Any) -> Iterator[Tuple[Any, Any]]:
+    if entry is None:
+        return iter(())
+    if isinstance(entry, _Leaf):
+        return iter(entry.pairs)
+    return _iter_pairs(entry)
+
+
+def _diff(a: Any, b: Any) -> Iterator[Tuple[Any, Any, Any]]:
+    """Yield (key, old, new) between two trie entries, skipping shared subtrees"""
+    if a is b:
+        return
+    if isinstance(a, _Node) and isinstance(b, _Node):
+        for index in a.children.keys() | b.children.keys():
+            yield from _diff(a.children.get(index), b.children.get(index))
+        return
+    old = dict(_pairs(a))
+    new = dict(_pairs(b))
+    for key, old_value in old.items():
+        new_value = new.get(key, _MISSING)
+        if new_value is _MISSING:
+            yield key, old_value, None
+        elif new_value is not old_value:
+            yield key, old_value, new_value
+    for key, new_value in new.items():
+        if key not in old:
+            yield key, None, new_value
+
+
+class PersistentMap(Mapping):
+    """Immutable mapping; set() and delete() return new maps"""
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Optional[Iterable[Tuple[Any, Any]]] = None):
+        self._root = _EMPTY
+        self._size = 0
+        if items is not None:
+            if isinstance(items, Mapping):
+                items = items.items()
+            for key, value in items:
+                self._root, added = _assoc(self._root, _hash(key), key, value, 0)
+                self._size += added
+
+    @classmethod
+    def _make(cls, root: _Node, size: int) -> "PersistentMap":
+        new_map = cls.__new__(cls)
+        new_map._root = root
+        new_map._size = size
+        return new_map
+
+    def set(self, key: Any, value: Any) -> "PersistentMap":
+        """Return a map with key bound to value"""
+        root, added = _assoc(self._root, _hash(key), key, value, 0)
+        if root is self._root:
+            return self
+        return self._make(root, self._size + added)
+
+    def delete(self, key: Any) -> "PersistentMap":
+        """Return a map without key (self if key is absent)"""
+        root = _dissoc(self._root, _hash(key), key, 0)
+        if root is self._root:
+            return self
+        return self._make(root, self._size - 1)
+
+    def diff(self, other: "PersistentMap") -> Iterator[Tuple[Any, Any, Any]]:
+        """Yield (key, old, new) for every key whose value differs in other
+
+        Missing values are reported as None. Subtrees shared between the two
+        maps are skipped, so diffing two versions costs O(changes), not O(size).
+        """
+        return _diff(self._root, other._root)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        key_hash = _hash(key)
+        node = self._root
+        shift = 0
+        while True:
+            child = node.children.get((key_hash >> shift) & _MASK)
+            if child is None:
+                return default
+            if isinstance(child, _Leaf):
+                if child.hash == key_hash:
+                    for existing_key, value in child.pairs:
+                        if existing_key == key:
+                            return value
+                return default
+            node = child
+            shift += _BITS
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in _iter_pairs(self._root):
+            yield key
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return _iter_pairs(self._root)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({dict(self.items())!r})"
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Replay a traffic recording against the server
+
+Feeds the inbound messages captured with `main.py --record PATH` back into a
+WebSocketServer, either in-process (through the same handle_client path as
+real connections) or over a local socket, at the recorded pace, N times
+faster, or as fast as possible. Events of all connections are replayed on
+one timeline in recorded order, so the speed only scales the pauses and a
+replay reproduces the same world at any speed. Each recorded connection can
+be multiplied across many synthetic clients to turn real traffic into a
+load test.
+
+    python3 replay.py session.rec --speed 0 --clients 50
+    python3 replay.py session.rec --socket ws://localhost:8765 --speed 4
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, parse_qsl
+from ws_server import WebSocketServer
+from rooms import DEFAULT_ROOM
+from traffic import TrafficEvent, read_recording, OPEN, MESSAGE, CLOSE
+
+
+class Dispatch(NamedTuple):
+    """One recorded event for one synthetic copy of its connection"""
+    t: float
+    copy: int
+    event: TrafficEvent
+
+
+class ReplayStats:
+    """Counters shared by all synthetic clients"""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.bytes_received = 0
+        self.latencies: List[float] = []
+
+
+class ReplayClock:
+    """Maps recorded timestamps to wall time; speed 0 means no waiting"""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.started = time.monotonic()
+
+    async def wait_until(self, t: float) -> None:
+        if self.speed <= 0:
+            return
+        delay = self.started + t / self.speed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def build_timeline(events: List[TrafficEvent], clients: int) -> List[Dispatch]:
+    """Every event of every copy on one timeline, in recorded order
+
+    Replay walks this list one event at a time at any speed, so messages
+    from different connections reach the server in the order it originally
+    received them; the speed only scales the pauses in between.
+    """
+    opened = set()
+    timeline = []
+    for event in events:
+        if event.kind == OPEN:
+            opened.add(event.connection)
+        elif event.connection not in opened:
+            continue
+        timeline.extend(Dispatch(event.t, copy, event) for copy in range(clients))
+    # Stable: ties keep recording order
+    timeline.sort(key=lambda dispatch: dispatch.t)
+    return timeline
+
+
+def client_path(path: str, copy: int, separate_rooms: bool) -> str:
+    """Handshake path for one synthetic copy of a session"""
+    if not separate_rooms:
+        return path
+    url = urlsplit(path)
+    query = dict(parse_qsl(url.query))
+    room = query.get("room") or url.path.strip("/") or DEFAULT_ROOM
+    query["room"] = f"{room}-{copy}"
+    return "/?" + urlencode(query)
+
+
+class ReplayConnection:
+    """Stands in for a WebSocket in in-process replay
+
+    The driver hands it one message at a time and only continues once the
+    server has processed it and is waiting for the next one.
+    """
+
+    def __init__(self, path: str, stats: ReplayStats):
+        self.path = path
+        self.stats = stats
+        self.task: Optional[asyncio.Task] = None
+        self._inbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._idle = asyncio.Event()
+
+    async def send(self, message: str) -> None:
+        self.stats.received += 1
+        self.stats.bytes_received += len(message)
+
+    async def close(self) -> None:
+        pass
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def _messages(self):
+        while True:
+            self._idle.set()
+            message = await self._inbox.get()
+            if message is None:
+                return
+            yield message
+
+    async def settle(self) -> None:
+        """Wait until the server wants the next message or has let go of us"""
+        idle = asyncio.ensure_future(self._idle.wait())
+        await asyncio.wait({idle, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        idle.cancel()
+
+    async def deliver(self, message: Optional[str]) -> None:
+        """Feed one message (None to disconnect) and wait until it is handled"""
+        if self.task.done():
+            return
+        self._idle.clear()
+        self._inbox.put_nowait(message)
+        if message is None:
+            await self.task
+            return
+        self.stats.sent += 1
+        started = time.perf_counter()
+        await self.settle()
+        self.stats.latencies.append(time.perf_counter() - started)
+
+
+async def replay_in_process(timeline: List[Dispatch], speed: float, separate_rooms: bool,
+                            room_dir: str) -> ReplayStats:
+    """Drive a fresh in-process WebSocketServer with the recorded timeline"""
+    server = WebSocketServer(room_dir=room_dir)
+    clock = ReplayClock(speed)
+    stats = ReplayStats()
+    connections: Dict[Tuple[int, int], ReplayConnection] = {}
+
+    for dispatch in timeline:
+        await clock.wait_until(dispatch.t)
+        event = dispatch.event
+        key = (dispatch.copy, event.connection)
+        if event.kind == OPEN:
+            connection = ReplayConnection(
+                client_path(event.data, dispatch.copy, separate_rooms), stats)
+            connection.task = asyncio.create_task(server.handle_client(connection))
+            connections[key] = connection
+            # Joined (initial state sent) before anything else happens
+            await connection.settle()
+        elif key not in connections:
+            continue
+        elif event.kind == MESSAGE:
+            await connections[key].deliver(event.data)
+        elif event.kind == CLOSE:
+            await connections.pop(key).deliver(None)
+
+    # Connections the recording never closed (e.g. it ended in a crash)
+    for connection in connections.values():
+        await connection.deliver(None)
+    return stats
+
+
+async def replay_socket(timeline: List[Dispatch], speed: float, separate_rooms: bool,
+                        uri: str) -> ReplayStats:
+    """Replay the recorded timeline against a running server
+
+    Messages are sent in recorded order from one task, but the server reads
+    each socket independently, so unlike in-process replay the order in
+    which it processes messages of different connections is not guaranteed.
+    """
+    import websockets
+
+    clock = ReplayClock(speed)
+    stats = ReplayStats()
+    connections = {}
+    readers = []
+
+    async def drain(websocket):
+        try:
+            async for message in websocket:
+                stats.received += 1
+                stats.bytes_received += len(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    for dispatch in timeline:
+        await clock.wait_until(dispatch.t)
+        event = dispatch.event
+        key = (dispatch.copy, event.connection)
+        if event.kind == OPEN:
+            path = client_path(event.data, dispatch.copy, separate_rooms)
+            websocket = await websockets.connect(uri.rstrip("/") + path)
+            connections[key] = websocket
+            readers.append(asyncio.create_task(drain(websocket)))
+        elif key not in connections:
+            continue
+        elif event.kind == MESSAGE:
+            await connections[key].send(event.data)
+            stats.sent += 1
+        elif event.kind == CLOSE:
+            await connections.pop(key).close()
+
+    for websocket in connections.values():
+        await websocket.close()
+    await asyncio.gather(*readers)
+    return stats
+
+
+def print_report(stats: ReplayStats, elapsed: float, sessions: int, clients: int):
+    print(f"connections:      {sessions * clients} ({sessions} recorded x {clients})")
+    print(f"messages sent:    {stats.sent}")
+    print(f"messages back:    {stats.received} ({stats.bytes_received} bytes)")
+    print(f"elapsed:          {elapsed:.3f} s")
+    print(f"throughput:       {stats.sent / elapsed if elapsed else 0:.0f} msg/s")
+    if stats.latencies:
+        latencies = sorted(stats.latencies)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"processing (ms):  p50 {statistics.median(latencies) * 1e3:.3f}"
+              f"  p99 {p99 * 1e3:.3f}  max {latencies[-1] * 1e3:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded T-R-A-V-I client traffic")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="time scale: 1 = recorded pace, N = N times faster, 0 = max speed")
+    parser.add_argument("--clients", type=int, default=1,
+                        help="synthetic clients per recorded connection")
+    parser.add_argument("--separate-rooms", action="store_true",
+                        help="give every synthetic copy its own room instead of sharing one")
+    parser.add_argument("--socket", metavar="URI",
+                        help="replay over WebSocket to a running server instead of in-process")
+    parser.add_argument("--room-dir", metavar="DIR",
+                        help="in-process room directory (default: a temporary one)")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    events = read_recording(args.recording)
+    sessions = sum(event.kind == OPEN for event in events)
+    timeline = build_timeline(events, args.clients)
+
+    started = time.monotonic()
+    if args.socket:
+        stats = asyncio.run(replay_socket(
+            timeline, args.speed, args.separate_rooms, args.socket))
+    elif args.room_dir:
+        stats = asyncio.run(replay_in_process(
+            timeline, args.speed, args.separate_rooms, args.room_dir))
+    else:
+        # Rooms are evicted to disk as in main.py, just not into rooms/
+        with tempfile.TemporaryDirectory(prefix="replay-rooms-") as room_dir:
+            stats = asyncio.run(replay_in_process(
+                timeline, args.speed, args.separate_rooms, room_dir))
+    print_report(stats, time.monotonic() - started, sessions, args.clients)
+
+if __name__ == "__main__":
+    main()
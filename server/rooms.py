@@ -0,0 +1,312 @@
+"""Rooms: independent worlds hosted in one server process
+
+Each room owns its own WorldState, CommandRouter, chunk store, client set
+and tick loop, so a busy room only competes with others for CPU time, never
+for state. Rooms without clients are suspended (their tick loop stops) and,
+when the manager has a data_dir, evicted to disk and dropped from memory
+after IDLE_TIMEOUT seconds.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set
+import websockets
+from websockets.server import WebSocketServerProtocol
+from world_state import WorldState
+from command_router import CommandRouter
+from world_chunks import ChunkStore, ChunkStreamer, active_chunks
+from schema import validate_viewpoint
+from messages import (
+    parse_message, create_state_message,
+    create_delta_message, create_error_message, create_chunks_message,
+    create_handles_message, create_update_message, encode_compact_updates, MessageType
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM = "lobby"
+TICK_RATE = 10.0       # Hz, per active room
+IDLE_TIMEOUT = 300.0   # seconds a room may sit empty before eviction
+
+_ROOM_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def is_valid_room_name(name: str) -> bool:
+    """Room names double as file names, so keep them to a safe alphabet"""
+    return bool(_ROOM_NAME.match(name))
+
+
+class Room:
+    """One isolated world and the clients editing it"""
+
+    def __init__(self, name: str, world_seed: int = 0):
+        self.name = name
+        self.clients: Set[WebSocketServerProtocol] = set()
+        self.world_state = WorldState()
+        self.command_router = CommandRouter(self.world_state)
+        # Each room gets its own procedural world derived from the base seed
+        self.chunk_store = ChunkStore(
+            seed=world_seed ^ zlib.crc32(name.encode("utf-8"))
+        )
+        self.streamers: Dict[WebSocketServerProtocol, ChunkStreamer] = {}
+        # Clients that opted into handle-based UPDATEs -> handles announced so far
+        self.compact_clients: Dict[WebSocketServerProtocol, int] = {}
+        self.tick_task: Optional[asyncio.Task] = None
+        self.idle_since: Optional[float] = time.monotonic()
+
+    @property
+    def suspended(self) -> bool:
+        return self.tick_task is None
+
+    async def register(self, websocket: WebSocketServerProtocol,
+                       since: Optional[int] = None, epoch: Optional[str] = None,
+                       compact: bool = False):
+        """Register a new client and send initial state
+
+        A reconnecting client passes the last version (and epoch) it applied
+        and only gets the changes since then, unless they have already left
+        the change history. Compact clients then get the handle table once
+        and receive transform changes as handle-based UPDATE messages.
+        """
+        self.clients.add(websocket)
+        if compact:
+            self.compact_clients[websocket] = 0
+        self.streamers[websocket] = ChunkStreamer(self.chunk_store)
+        self.idle_since = None
+        if self.tick_task is None:
+            self.tick_task = asyncio.create_task(self.tick_loop())
+        logger.info(f"Client joined room {self.name}. Room clients: {len(self.clients)}")
+
+        delta = None
+        if since is not None:
+            delta = self.world_state.changes_since(since, epoch)
+            if delta is None:
+                logger.info(f"Version {since} outside change history; sending full state")
+
+        if delta is not None:
+            await websocket.send(create_delta_message(delta))
+        else:
+            # Send current world state to new client
+            state_msg = create_state_message(
+                self.world_state.get_all_entities(),
+                self.world_state.version,
+                self.world_state.epoch
+            )
+            await websocket.send(state_msg)
+        if compact:
+            for entity_id in self.world_state.entities:
+                self.world_state.handle_for(entity_id)
+            await self._announce_handles(websocket)
+
+    async def unregister(self, websocket: WebSocketServerProtocol):
+        """Unregister a disconnected client, suspending the room when empty"""
+        self.clients.discard(websocket)
+        self.streamers.pop(websocket, None)
+        self.compact_clients.pop(websocket, None)
+        logger.info(f"Client left room {self.name}. Room clients: {len(self.clients)}")
+        if not self.clients:
+            self.suspend()
+
+    def suspend(self):
+        """Stop ticking until a client joins again"""
+        if self.tick_task is not None:
+            self.tick_task.cancel()
+            self.tick_task = None
+        self.idle_since = time.monotonic()
+        logger.info(f"[ROOM] suspended {self.name}")
+
+    async def _announce_handles(self, websocket: WebSocketServerProtocol):
+        """Send a compact client the handles assigned since its last announcement"""
+        announced = self.compact_clients.get(websocket)
+        handle_ids = self.world_state.handle_ids
+        if announced is None or announced >= len(handle_ids):
+            return
+        self.compact_clients[websocket] = len(handle_ids)
+        handles = {
+            entity_id: handle
+            for handle, entity_id in enumerate(handle_ids[announced:], announced)
+        }
+        await websocket.send(create_handles_message(handles))
+
+    async def _send_compact(self, websocket: WebSocketServerProtocol, message: str):
+        """Announce new handles first so every handle in message is known"""
+        await self._announce_handles(websocket)
+        await websocket.send(message)
+
+    async def broadcast(self, message: str, updates: Optional[List[List[Any]]] = None,
+                        version: Optional[int] = None):
+        """Broadcast a message to all clients in this room
+
+        When updates (compact [handle, field_code, value] entries equivalent
+        to message, produced at version) are given, compact clients get an
+        UPDATE instead.
+        """
+        if not self.clients:
+            return
+        compact_message = message
+        if updates and version is not None and self.compact_clients:
+            compact_message = create_update_message(version, updates)
+        await asyncio.gather(
+            *[
+                self._send_compact(client, compact_message)
+                if client in self.compact_clients else client.send(message)
+                for client in self.clients
+            ],
+            return_exceptions=True
+        )
+
+    def compact_updates(self, changes: Iterable[Any]) -> Optional[List[List[Any]]]:
+        """Compact entries for changes, or None if compact clients need the full message"""
+        return encode_compact_updates(changes, self.world_state.handle_for)
+
+    async def process_message(self, raw_message: str, sender: WebSocketServerProtocol):
+        """Process incoming message and broadcast updates"""
+        try:
+            msg = parse_message(raw_message)
+            msg_type = msg["type"]
+            payload = msg["payload"]
+
+            if msg_type == MessageType.COMMAND:
+                command = payload.get("command")
+                params = payload.get("params", {})
+
+                if command:
+                    before = self.world_state.entities
+                    event_msg = self.command_router.route_command(command, params)
+                    if event_msg:
+                        updates = None
+                        if self.compact_clients:
+                            updates = self.compact_updates(before.diff(self.world_state.entities))
+                        await self.broadcast(event_msg, updates, self.world_state.version)
+                    else:
+                        logger.warning(f"Command failed or unknown: {command}")
+                        error_msg = create_error_message(f"Command failed or unknown: {command}")
+                        await sender.send(error_msg)
+
+            elif msg_type == MessageType.VIEWPOINT:
+                validate_viewpoint(payload)
+                streamer = self.streamers.get(sender)
+                if streamer:
+                    streamer.set_viewpoint(payload["position"])
+
+            elif msg_type == MessageType.PING:
+                # Simple ping/pong for connection health
+                pass
+
+        except ValueError as e:
+            logger.error(f"Invalid message received: {e}")
+            error_msg = create_error_message(str(e))
+            await sender.send(error_msg)
+
+    async def stream_chunks(self):
+        """Send each client its next bounded batch of nearby chunks"""
+        for websocket, streamer in list(self.streamers.items()):
+            batch = streamer.next_batch()
+            if batch:
+                try:
+                    await websocket.send(create_chunks_message(batch))
+                except websockets.exceptions.ConnectionClosed:
+                    pass
+        self.chunk_store.evict(active_chunks(self.streamers.values()))
+
+    async def tick(self):
+        """Advance chunk streaming by one tick
+
+        Deliberately no simulation here: pet following (update_pet_behavior)
+        would bump the version every tick, flood the reconnect history and be
+        reverted by undo, so it stays opt-in for callers that want it.
+        """
+        await self.stream_chunks()
+
+    async def tick_loop(self):
+        """Tick at TICK_RATE while the room has clients"""
+        while True:
+            started = time.monotonic()
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Tick failed in room {self.name}: {e}")
+            await asyncio.sleep(max(0.0, 1.0 / TICK_RATE - (time.monotonic() - started)))
+
+    def to_dict(self) -> Dict:
+        """Serializable room state (undo history is not persisted)"""
+        return {
+            "name": self.name,
+            "version": self.world_state.version,
+            "epoch": self.world_state.epoch,
+            "entities": self.world_state.get_all_entities()
+        }
+
+
+class RoomManager:
+    """Creates, suspends, evicts and resumes rooms"""
+
+    def __init__(self, data_dir: Optional[str] = None, world_seed: int = 0,
+                 idle_timeout: float = IDLE_TIMEOUT):
+        self.data_dir = data_dir
+        self.world_seed = world_seed
+        self.idle_timeout = idle_timeout
+        self.rooms: Dict[str, Room] = {}
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.room.json")
+
+    def get_room(self, name: str) -> Room:
+        """Return a live room, resuming it from disk or creating it"""
+        room = self.rooms.get(name)
+        if room is not None:
+            return room
+
+        room = Room(name, self.world_seed)
+        if self.data_dir and os.path.exists(self._path(name)):
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            room.world_state.load(data["entities"], data.get("version", 0), data.get("epoch"))
+            logger.info(f"[ROOM] resumed {name} from disk")
+        else:
+            logger.info(f"[ROOM] created {name}")
+        self.rooms[name] = room
+        return room
+
+    def evict(self, name: str) -> bool:
+        """Write a suspended room to disk and drop it from memory
+
+        Without a data_dir there is nowhere to keep the world, so the room
+        is only suspended and stays in memory.
+        """
+        room = self.rooms.get(name)
+        if room is None or room.clients:
+            return False
+        if not room.suspended:
+            room.suspend()
+        if not self.data_dir:
+            return False
+        tmp_path = self._path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(room.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, self._path(name))
+        del self.rooms[name]
+        logger.info(f"[ROOM] evicted {name}")
+        return True
+
+    def evict_idle(self) -> int:
+        """Evict every room that has been empty longer than idle_timeout"""
+        now = time.monotonic()
+        idle = [
+            name for name, room in self.rooms.items()
+            if not room.clients and room.idle_since is not None
+            and now - room.idle_since >= self.idle_timeout
+        ]
+        return sum(self.evict(name) for name in idle)
+
+    async def janitor_loop(self):
+        """Periodically evict idle rooms"""
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            self.evict_idle()
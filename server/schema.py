@@ -0,0 +1,238 @@
+"""Declarative schemas for commands and entity components
+
+Schemas are plain dicts. They are compiled once at import time into small
+closures, so validating a command costs a handful of type checks and no
+schema interpretation. Every compiled check returns the (possibly clamped)
+value or raises ValueError.
+"""
+import math
+from typing import Any, Callable, Dict
+
+Check = Callable[[Any], Any]
+
+_MISSING = object()
+_NUMBER_TYPES = frozenset({int, float})
+_SEQUENCE_TYPES = frozenset({list, tuple})
+
+
+def _is_number(value: Any) -> bool:
+    """int or finite float: json.loads accepts NaN/Infinity, JSON.parse does not"""
+    return type(value) in _NUMBER_TYPES and (type(value) is int or math.isfinite(value))
+
+
+# Entity components
+VEC3 = {"type": "vector", "length": 3}
+COLOR = {"type": "vector", "length": 4, "min": 0, "max": 1}
+STATS = {"type": "mapping", "values": {"type": "number"}}
+
+COMPONENT_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "type": {"type": "string"},
+    "position": VEC3,
+    "rotation": VEC3,
+    "scale": VEC3,
+    "color": COLOR,
+    "meta": {"type": "dict"},
+    "stats": STATS,
+    "movement": {
+        "type": "object",
+        "fields": {
+            "speed": {"type": "number", "min": 0},
+            "jump_strength": {"type": "number", "min": 0}
+        }
+    },
+    "inventory": {"type": "list"},
+    "behavior": {
+        "type": "object",
+        "fields": {
+            "mode": {"type": "string"},
+            "target_id": {"type": "string", "nullable": True}
+        }
+    }
+}
+
+ENTITY_ID = {"type": "string"}
+NAME = {"type": "string"}
+
+COMMAND_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "spawn_entity": {
+        "type": "object",
+        "fields": dict(COMPONENT_SCHEMAS, entity_id=ENTITY_ID),
+        "required": ["entity_id"]
+    },
+    "move_entity": {
+        "type": "object",
+        "fields": {"entity_id": ENTITY_ID, "position": VEC3},
+        "required": ["entity_id", "position"]
+    },
+    "set_color": {
+        "type": "object",
+        "fields": {"entity_id": ENTITY_ID, "color": COLOR},
+        "required": ["entity_id", "color"]
+    },
+    "delete_entity": {
+        "type": "object",
+        "fields": {"entity_id": ENTITY_ID},
+        "required": ["entity_id"]
+    },
+    "undo": {"type": "object"},
+    "redo": {"type": "object"},
+    "create_checkpoint": {"type": "object", "fields": {"name": NAME}, "required": ["name"]},
+    "restore_checkpoint": {"type": "object", "fields": {"name": NAME}, "required": ["name"]},
+    "create_branch": {
+        "type": "object",
+        "fields": {"name": NAME, "checkpoint": NAME},
+        "required": ["name"]
+    },
+    "switch_branch": {"type": "object", "fields": {"name": NAME}, "required": ["name"]}
+}
+
+# Far beyond any reachable position, small enough for exact chunk math
+WORLD_LIMIT = 1_000_000_000
+
+VIEWPOINT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "fields": {
+        "position": {"type": "vector", "length": 3, "min": -WORLD_LIMIT, "max": WORLD_LIMIT}
+    },
+    "required": ["position"]
+}
+
+# Per-entity-type stat rules; stats not listed here only need to be numeric
+STAT_SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "player": {
+        "health": {"type": "number", "min": 0},
+        "stamina": {"type": "number", "min": 0},
+        "mana": {"type": "number", "min": 0},
+        "level": {"type": "number", "min": 1}
+    },
+    "pet": {
+        "health": {"type": "number", "min": 0},
+        "loyalty": {"type": "number", "clamp": [0, 100]}
+    }
+}
+
+
+def _compile_string(schema: Dict[str, Any], path: str) -> Check:
+    def check(value):
+        if type(value) is not str or not value:
+            raise ValueError(f"{path} must be a non-empty string")
+        return value
+    return check
+
+
+def _compile_number(schema: Dict[str, Any], path: str) -> Check:
+    low = schema.get("min")
+    high = schema.get("max")
+    clamp = schema.get("clamp")
+
+    def check(value):
+        if not _is_number(value):
+            raise ValueError(f"{path} must be a number")
+        if clamp is not None:
+            return max(clamp[0], min(clamp[1], value))
+        if low is not None and value < low:
+            raise ValueError(f"{path} must be >= {low}")
+        if high is not None and value > high:
+            raise ValueError(f"{path} must be <= {high}")
+        return value
+    return check
+
+
+def _compile_vector(schema: Dict[str, Any], path: str) -> Check:
+    length = schema["length"]
+    low = schema.get("min")
+    high = schema.get("max")
+    message = f"{path} must be a list of {length} numbers"
+    if low is not None:
+        message += f" in [{low}, {high}]"
+
+    def check(value):
+        if type(value) not in _SEQUENCE_TYPES or len(value) != length:
+            raise ValueError(message)
+        for component in value:
+            if not _is_number(component):
+                raise ValueError(message)
+            if low is not None and not low <= component <= high:
+                raise ValueError(message)
+        return value
+    return check
+
+
+def _compile_object(schema: Dict[str, Any], path: str) -> Check:
+    required = set(schema.get("required", ()))
+    fields = tuple(
+        (name, name in required, compile_schema(sub, name if not path else f"{path}.{name}"))
+        for name, sub in schema.get("fields", {}).items()
+    )
+    label = path or "params"
+
+    def check(value):
+        if type(value) is not dict:
+            raise ValueError(f"{label} must be an object")
+        for name, is_required, check_field in fields:
+            field = value.get(name, _MISSING)
+            if field is _MISSING:
+                if is_required:
+                    raise ValueError(f"{name} is required")
+                continue
+            check_field(field)
+        return value
+    return check
+
+
+def _compile_mapping(schema: Dict[str, Any], path: str) -> Check:
+    check_value = compile_schema(schema["values"], f"{path} value")
+
+    def check(value):
+        if type(value) is not dict:
+            raise ValueError(f"{path} must be an object")
+        for item in value.values():
+            check_value(item)
+        return value
+    return check
+
+
+def _compile_container(container_type: type) -> Callable[[Dict[str, Any], str], Check]:
+    def compile_container(schema: Dict[str, Any], path: str) -> Check:
+        def check(value):
+            if type(value) is not container_type:
+                raise ValueError(f"{path} must be a {container_type.__name__}")
+            return value
+        return check
+    return compile_container
+
+
+_COMPILERS = {
+    "string": _compile_string,
+    "number": _compile_number,
+    "vector": _compile_vector,
+    "object": _compile_object,
+    "mapping": _compile_mapping,
+    "dict": _compile_container(dict),
+    "list": _compile_container(list)
+}
+
+
+def compile_schema(schema: Dict[str, Any], path: str = "") -> Check:
+    """Compile a declarative schema into a validator function"""
+    check = _COMPILERS[schema["type"]](schema, path)
+    if not schema.get("nullable"):
+        return check
+
+    def check_nullable(value):
+        return None if value is None else check(value)
+    return check_nullable
+
+
+COMMAND_VALIDATORS: Dict[str, Check] = {
+    command: compile_schema(schema) for command, schema in COMMAND_SCHEMAS.items()
+}
+
+validate_viewpoint = compile_schema(VIEWPOINT_SCHEMA)
+
+STAT_VALIDATORS: Dict[str, Dict[str, Check]] = {
+    entity_type: {key: compile_schema(schema, key) for key, schema in rules.items()}
+    for entity_type, rules in STAT_SCHEMAS.items()
+}
+
+check_stat = compile_schema({"type": "number"}, "stat")
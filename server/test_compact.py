@@ -0,0 +1,78 @@
+"""Tests for entity handles and compact UPDATE encoding"""
+import json
+import pytest
+from world_state import WorldState
+from command_router import CommandRouter
+from messages import FIELD_CODES, create_update_message, encode_compact_updates
+
+
+def run(router, command, params):
+    """Route a command and return the compact entries for its changes"""
+    world = router.world_state
+    before = world.entities
+    assert router.route_command(command, params) is not None
+    return encode_compact_updates(before.diff(world.entities), world.handle_for)
+
+
+def make_router():
+    router = CommandRouter(WorldState())
+    router.route_command("spawn_entity", {"entity_id": "cube"})
+    return router
+
+
+def test_handles_are_stable_and_never_reused():
+    world = WorldState()
+    world.spawn_entity("a", {})
+    world.spawn_entity("b", {})
+    world.delete_entity("a")
+    world.spawn_entity("c", {})
+    world.spawn_entity("a", {})
+    assert world.handles == {"a": 0, "b": 1, "c": 2}
+    assert world.entity_id_for(2) == "c"
+    assert world.entity_id_for(3) is None
+
+
+def test_transform_changes_encode_compactly():
+    router = make_router()
+    assert run(router, "move_entity", {"entity_id": "cube", "position": [1, 2, 3]}) == [
+        [0, FIELD_CODES["position"], [1, 2, 3]]
+    ]
+    assert run(router, "set_color", {"handle": 0, "color": [0, 1, 0, 1]}) == [
+        [0, FIELD_CODES["color"], [0, 1, 0, 1]]
+    ]
+
+
+def test_structural_changes_fall_back_to_full_event():
+    router = make_router()
+    assert run(router, "spawn_entity", {"entity_id": "other"}) is None
+    assert run(router, "delete_entity", {"entity_id": "other"}) is None
+
+
+def test_commands_without_entity_changes_fall_back_to_full_event():
+    router = make_router()
+    assert run(router, "create_checkpoint", {"name": "start"}) is None
+    assert run(router, "create_branch", {"name": "what_if"}) is None
+
+
+def test_non_compact_field_changes_fall_back():
+    world = WorldState()
+    world.spawn_entity("dog", {"type": "pet"})
+    before = world.entities
+    world.update_stats("dog", {"loyalty": 10})
+    assert encode_compact_updates(before.diff(world.entities), world.handle_for) is None
+
+
+def test_handle_commands():
+    router = make_router()
+    router.route_command("move_entity", {"handle": 0, "position": [4, 0, 0]})
+    assert router.world_state.get_entity("cube")["position"] == [4, 0, 0]
+    with pytest.raises(ValueError, match="Unknown entity handle"):
+        router.route_command("delete_entity", {"handle": 7})
+    with pytest.raises(ValueError, match="requires entity_id"):
+        router.route_command("spawn_entity", {"handle": 0, "color": [1, 0, 0, 1]})
+    assert router.world_state.get_entity("cube")["color"] == [1, 1, 1, 1]
+
+
+def test_update_message_shape():
+    message = json.loads(create_update_message(3, [[0, 0, [1, 2, 3]]]))
+    assert message == {"type": "UPDATE", "payload": {"v": 3, "u": [[0, 0, [1, 2, 3]]]}}
@@ -0,0 +1,108 @@
+"""Tests for the persistent hash map"""
+import random
+from persistent_map import PersistentMap
+
+
+class Colliding:
+    """Key type whose hash collides on purpose"""
+
+    def __init__(self, name, key_hash):
+        self.name = name
+        self.key_hash = key_hash
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and self.name == other.name
+
+    def __repr__(self):
+        return f"Colliding({self.name!r})"
+
+
+def test_matches_dict_under_random_edits():
+    rng = random.Random(1234)
+    m = PersistentMap()
+    expected = {}
+    for i in range(20000):
+        key = rng.randrange(3000)
+        if rng.random() < 0.3:
+            m = m.delete(key)
+            expected.pop(key, None)
+        else:
+            m = m.set(key, i)
+            expected[key] = i
+        assert len(m) == len(expected)
+    assert dict(m.items()) == expected
+    assert all(m[key] == value for key, value in expected.items())
+    assert set(m) == set(expected)
+
+
+def test_old_versions_are_untouched():
+    v1 = PersistentMap({"a": 1, "b": 2})
+    v2 = v1.set("a", 10).delete("b").set("c", 3)
+    assert dict(v1.items()) == {"a": 1, "b": 2}
+    assert dict(v2.items()) == {"a": 10, "c": 3}
+
+
+def test_noop_updates_return_same_map():
+    value = object()
+    m = PersistentMap({"a": value})
+    assert m.set("a", value) is m
+    assert m.delete("missing") is m
+
+
+def test_hash_collisions():
+    keys = [Colliding(f"k{i}", 42) for i in range(5)]
+    m = PersistentMap()
+    for i, key in enumerate(keys):
+        m = m.set(key, i)
+    assert len(m) == 5
+    assert [m[key] for key in keys] == [0, 1, 2, 3, 4]
+    assert Colliding("other", 42) not in m
+
+    m = m.delete(keys[2]).set(keys[0], "zero")
+    assert len(m) == 4
+    assert keys[2] not in m
+    assert m[keys[0]] == "zero"
+
+
+def test_partial_hash_collisions_collapse_on_delete():
+    # Same low 30 bits: the keys share four trie levels before splitting
+    a = Colliding("a", 0x3FFFFFFF)
+    b = Colliding("b", 0x3FFFFFFF | (1 << 40))
+    m = PersistentMap().set(a, 1).set(b, 2)
+    assert m[a] == 1 and m[b] == 2
+    m = m.delete(b)
+    assert len(m) == 1 and m[a] == 1 and b not in m
+    m = m.delete(a)
+    assert len(m) == 0 and list(m) == []
+
+
+def test_diff_reports_changed_keys_only():
+    rng = random.Random(99)
+    base = PersistentMap((i, object()) for i in range(2000))
+    m = base
+    for _ in range(200):
+        key = rng.randrange(2500)
+        if rng.random() < 0.3:
+            m = m.delete(key)
+        else:
+            m = m.set(key, object())
+    old, new = dict(base.items()), dict(m.items())
+    expected = {
+        key: (old.get(key), new.get(key))
+        for key in old.keys() | new.keys()
+        if old.get(key) is not new.get(key)
+    }
+    got = {key: (before, after) for key, before, after in base.diff(m)}
+    assert got == expected
+    assert list(m.diff(m)) == []
+
+
+def test_diff_with_collisions():
+    a, b = Colliding("a", 7), Colliding("b", 7)
+    v1 = PersistentMap().set(a, 1)
+    v2 = v1.set(b, 2)
+    assert list(v1.diff(v2)) == [(b, None, 2)]
+    assert list(v2.diff(v1)) == [(b, 2, None)]
@@ -0,0 +1,60 @@
+"""Tests for command validation"""
+import pytest
+from world_state import WorldState
+from command_router import CommandRouter
+
+
+def test_malformed_params_raise_with_reason():
+    router = CommandRouter(WorldState())
+    router.route_command("spawn_entity", {"entity_id": "cube"})
+    with pytest.raises(ValueError, match="position must be a list of 3 numbers"):
+        router.route_command("move_entity", {"entity_id": "cube", "position": [1, "a", 0]})
+    with pytest.raises(ValueError, match="color must be a list of 4 numbers"):
+        router.route_command("set_color", {"entity_id": "cube", "color": [2, 0, 0, 1]})
+    with pytest.raises(ValueError, match="entity_id is required"):
+        router.route_command("delete_entity", {})
+    assert router.world_state.version == 1
+
+
+def test_unknown_command_returns_none():
+    assert CommandRouter(WorldState()).route_command("explode", {}) is None
+
+
+def test_spawn_stats_follow_type_rules():
+    router = CommandRouter(WorldState())
+    with pytest.raises(ValueError, match="health must be >= 0"):
+        router.route_command("spawn_entity", {
+            "entity_id": "dog", "type": "pet", "stats": {"loyalty": 999, "health": -5}
+        })
+    assert router.world_state.get_entity("dog") is None
+
+    router.route_command("spawn_entity", {
+        "entity_id": "dog", "type": "pet", "stats": {"loyalty": 999, "health": 5}
+    })
+    assert router.world_state.get_entity("dog")["stats"] == {"loyalty": 100, "health": 5}
+
+    with pytest.raises(ValueError, match="level must be >= 1"):
+        router.route_command("spawn_entity", {
+            "entity_id": "hero", "type": "player", "stats": {"level": 0}
+        })
+
+
+def test_update_stats_skips_invalid_values():
+    world = WorldState()
+    world.spawn_entity("dog", {"type": "pet"})
+    entity = world.update_stats("dog", {"loyalty": -20, "health": -1, "mood": "happy"})
+    assert entity["stats"] == {"health": 50, "loyalty": 0}
+
+
+def test_non_finite_numbers_are_rejected():
+    # json.loads accepts these, but browsers cannot JSON.parse them back
+    router = CommandRouter(WorldState())
+    router.route_command("spawn_entity", {"entity_id": "cube"})
+    for position in ([float("nan"), 0, 0], [float("inf"), 0, 0], [1e400, 0, 0]):
+        with pytest.raises(ValueError, match="position must be a list of 3 numbers"):
+            router.route_command("move_entity", {"entity_id": "cube", "position": position})
+    with pytest.raises(ValueError, match="must be a number"):
+        router.route_command("spawn_entity", {
+            "entity_id": "dog", "type": "pet", "stats": {"health": float("nan")}
+        })
+    assert router.world_state.get_entity("cube")["position"] == [0, 0, 0]
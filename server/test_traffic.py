@@ -0,0 +1,27 @@
+"""Tests for the traffic recorder"""
+from traffic import TrafficRecorder, read_recording, OPEN, MESSAGE, CLOSE
+
+
+def test_events_reach_disk_without_close(tmp_path):
+    path = str(tmp_path / "session.rec")
+    recorder = TrafficRecorder(path)
+    connection = recorder.open("/lobby")
+    recorder.record(connection, '{"type": "PING", "payload": {}}')
+    # No close()/stop(): simulates a crash with the connection still open
+    events = read_recording(path)
+    assert [event.kind for event in events] == [OPEN, MESSAGE]
+    recorder.stop()
+
+
+def test_appended_sessions_do_not_collide(tmp_path):
+    path = str(tmp_path / "session.rec")
+    for _ in range(2):
+        recorder = TrafficRecorder(path)
+        connection = recorder.open("/lobby")
+        recorder.record(connection, "{}")
+        recorder.close(connection)
+        recorder.stop()
+    events = read_recording(path)
+    assert [event.kind for event in events] == [OPEN, MESSAGE, CLOSE] * 2
+    assert {event.connection for event in events} == {0, 1}
+    assert all(a.t <= b.t for a, b in zip(events, events[1:]))
@@ -0,0 +1,71 @@
+"""Tests for procedural chunk generation and streaming"""
+import pytest
+from schema import validate_viewpoint, WORLD_LIMIT
+from world_chunks import ChunkStore, ChunkStreamer, chunk_coord, generate_chunk, CHUNK_SIZE
+
+
+def drain(streamer):
+    loaded, unloaded = [], []
+    while True:
+        batch = streamer.next_batch()
+        if batch is None:
+            return loaded, unloaded
+        loaded += [tuple(chunk["coord"]) for chunk in batch["chunks"]]
+        unloaded += [tuple(coord) for coord in batch["unloaded"]]
+
+
+def test_generation_is_deterministic():
+    assert generate_chunk(7, (3, -2)) == generate_chunk(7, (3, -2))
+
+
+def test_streams_neighbourhood_nearest_first():
+    streamer = ChunkStreamer(ChunkStore(seed=1), radius=1, batch_size=4)
+    streamer.set_viewpoint([0, 0, 0])
+    loaded, unloaded = drain(streamer)
+    assert loaded[0] == (0, 0)
+    assert len(loaded) == 9 and unloaded == []
+
+
+def test_chunk_that_returns_before_unload_is_not_in_both_lists():
+    streamer = ChunkStreamer(ChunkStore(seed=1), radius=0)
+    streamer.set_viewpoint([0, 0, 0])
+    drain(streamer)
+    streamer.set_viewpoint([CHUNK_SIZE * 5, 0, 0])
+    streamer.set_viewpoint([0, 0, 0])
+    # (0, 0) never left the client and (5, 0) was never sent
+    assert drain(streamer) == ([], [])
+
+
+def test_batch_never_loads_and_unloads_the_same_chunk():
+    streamer = ChunkStreamer(ChunkStore(seed=1), radius=0)
+    streamer.set_viewpoint([0, 0, 0])
+    drain(streamer)
+    streamer.set_viewpoint([CHUNK_SIZE * 5, 0, 0])
+    drain(streamer)
+    streamer.set_viewpoint([0, 0, 0])
+    streamer.set_viewpoint([CHUNK_SIZE * 5, 0, 0])
+    streamer.set_viewpoint([0, 0, 0])
+    batch = streamer.next_batch()
+    loaded = {tuple(chunk["coord"]) for chunk in batch["chunks"]}
+    unloaded = {tuple(coord) for coord in batch["unloaded"]}
+    assert loaded == {(0, 0)} and unloaded == {(5, 0)}
+
+
+def test_out_of_range_viewpoint_is_rejected():
+    with pytest.raises(ValueError):
+        validate_viewpoint({"position": [1e400, 0, 0]})
+    with pytest.raises(ValueError):
+        validate_viewpoint({"position": [WORLD_LIMIT * 2, 0, 0]})
+    assert chunk_coord([float("inf"), 0, -10 ** 400]) == (
+        WORLD_LIMIT // CHUNK_SIZE, -WORLD_LIMIT // CHUNK_SIZE
+    )
+
+
+def test_evicted_chunks_regenerate_identically():
+    store = ChunkStore(seed=3, max_loaded=2)
+    first = store.get((0, 0))
+    store.get((1, 0))
+    store.get((2, 0))
+    assert store.evict(keep={(2, 0)}) == 1
+    assert list(store.loaded) == [(1, 0), (2, 0)]
+    assert store.get((0, 0)) == first
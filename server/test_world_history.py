@@ -0,0 +1,107 @@
+"""Tests for snapshots, undo/redo, checkpoints and branches"""
+from world_state import WorldState
+from command_router import CommandRouter
+from world_history import WorldHistory
+
+
+def make_router():
+    router = CommandRouter(WorldState())
+    router.route_command("spawn_entity", {"entity_id": "cube", "position": [0, 0, 0]})
+    return router
+
+
+def position(router):
+    return router.world_state.get_entity("cube")["position"]
+
+
+def test_snapshot_is_isolated_from_later_edits():
+    world = WorldState()
+    world.spawn_entity("cube", {"position": [0, 0, 0]})
+    snapshot = world.snapshot()
+    world.move_entity("cube", [1, 2, 3])
+    world.update_stats("cube", {"health": 1})
+    assert snapshot.entities["cube"]["position"] == [0, 0, 0]
+    world.restore(snapshot)
+    assert world.get_entity("cube")["position"] == [0, 0, 0]
+
+
+def test_undo_redo():
+    router = make_router()
+    router.route_command("move_entity", {"entity_id": "cube", "position": [1, 0, 0]})
+    router.route_command("move_entity", {"entity_id": "cube", "position": [2, 0, 0]})
+
+    assert router.route_command("undo", {}) is not None
+    assert position(router) == [1, 0, 0]
+    router.route_command("undo", {})
+    router.route_command("undo", {})
+    assert router.world_state.get_entity("cube") is None
+    assert router.route_command("undo", {}) is None
+
+    router.route_command("redo", {})
+    router.route_command("redo", {})
+    assert position(router) == [1, 0, 0]
+
+
+def test_new_edit_clears_redo():
+    router = make_router()
+    router.route_command("move_entity", {"entity_id": "cube", "position": [1, 0, 0]})
+    router.route_command("undo", {})
+    router.route_command("set_color", {"entity_id": "cube", "color": [0, 1, 0, 1]})
+    assert router.route_command("redo", {}) is None
+
+
+def test_failed_commands_are_not_recorded():
+    router = make_router()
+    router.route_command("move_entity", {"entity_id": "missing", "position": [1, 0, 0]})
+    router.route_command("undo", {})
+    assert router.world_state.get_entity("cube") is None
+
+
+def test_checkpoint_restore_is_undoable():
+    router = make_router()
+    router.route_command("create_checkpoint", {"name": "start"})
+    router.route_command("move_entity", {"entity_id": "cube", "position": [5, 0, 0]})
+    router.route_command("restore_checkpoint", {"name": "start"})
+    assert position(router) == [0, 0, 0]
+    router.route_command("undo", {})
+    assert position(router) == [5, 0, 0]
+    assert router.route_command("restore_checkpoint", {"name": "nope"}) is None
+
+
+def test_branches_keep_separate_worlds_and_stacks():
+    router = make_router()
+    router.route_command("create_branch", {"name": "what_if"})
+    router.route_command("switch_branch", {"name": "what_if"})
+    router.route_command("delete_entity", {"entity_id": "cube"})
+    assert router.world_state.get_entity("cube") is None
+
+    router.route_command("switch_branch", {"name": "main"})
+    assert position(router) == [0, 0, 0]
+    # main's own undo stack still holds the spawn
+    router.route_command("undo", {})
+    assert router.world_state.get_entity("cube") is None
+
+    router.route_command("switch_branch", {"name": "what_if"})
+    router.route_command("undo", {})
+    assert position(router) == [0, 0, 0]
+
+
+def test_branch_from_checkpoint():
+    router = make_router()
+    router.route_command("create_checkpoint", {"name": "start"})
+    router.route_command("move_entity", {"entity_id": "cube", "position": [9, 0, 0]})
+    router.route_command("create_branch", {"name": "retry", "checkpoint": "start"})
+    router.route_command("switch_branch", {"name": "retry"})
+    assert position(router) == [0, 0, 0]
+
+
+def test_undo_limit():
+    world = WorldState()
+    history = WorldHistory(world, limit=3)
+    for i in range(5):
+        before = world.snapshot()
+        world.spawn_entity(f"e{i}", {})
+        history.record(before)
+    while history.undo():
+        pass
+    assert len(world.entities) == 2
@@ -0,0 +1,69 @@
+"""Tests for world versions and reconnect catch-up"""
+from world_state import WorldState
+
+
+def test_changes_since_collapses_to_latest_per_entity():
+    world = WorldState()
+    world.spawn_entity("a", {})
+    world.spawn_entity("b", {})
+    since = world.version
+    world.move_entity("a", [1, 0, 0])
+    world.move_entity("a", [2, 0, 0])
+    world.delete_entity("b")
+    world.spawn_entity("c", {})
+
+    delta = world.changes_since(since, world.epoch)
+    assert delta["since"] == since and delta["version"] == world.version
+    assert set(delta["updated"]) == {"a", "c"}
+    assert delta["updated"]["a"]["position"] == [2, 0, 0]
+    assert delta["deleted"] == ["b"]
+
+
+def test_changes_since_current_version_is_empty():
+    world = WorldState()
+    world.spawn_entity("a", {})
+    delta = world.changes_since(world.version, world.epoch)
+    assert delta["updated"] == {} and delta["deleted"] == []
+
+
+def test_full_snapshot_needed_for_unknown_epoch_or_future_version():
+    world = WorldState()
+    world.spawn_entity("a", {})
+    assert world.changes_since(0, "other-epoch") is None
+    assert world.changes_since(0, None) is None
+    assert world.changes_since(world.version + 1, world.epoch) is None
+
+
+def test_history_floor():
+    world = WorldState(history_size=4)
+    for i in range(6):
+        world.spawn_entity(f"e{i}", {})
+    # Versions 1-2 fell out of the ring; version 2 is the oldest servable
+    assert world.history_floor == 2
+    assert world.changes_since(1, world.epoch) is None
+    delta = world.changes_since(2, world.epoch)
+    assert set(delta["updated"]) == {"e2", "e3", "e4", "e5"}
+
+
+def test_restore_logs_only_the_diff():
+    world = WorldState()
+    for i in range(100):
+        world.spawn_entity(f"e{i}", {})
+    snapshot = world.snapshot()
+    world.move_entity("e1", [5, 0, 0])
+    world.delete_entity("e2")
+    since = world.version
+    world.restore(snapshot)
+
+    delta = world.changes_since(since, world.epoch)
+    assert set(delta["updated"]) == {"e1", "e2"}
+    assert delta["updated"]["e1"]["position"] == [0, 0, 0]
+    assert delta["deleted"] == []
+
+
+def test_load_resets_history():
+    world = WorldState()
+    world.load({"a": {"entity_id": "a"}}, version=40, epoch="saved")
+    assert world.changes_since(40, "saved")["updated"] == {}
+    assert world.changes_since(39, "saved") is None
+
@@ -0,0 +1,107 @@
+"""Session traffic recording for incident reproduction and load testing
+
+A recording is an append-only file of newline-delimited compact JSON. The
+first line is a header; every other line is one event:
+
+    [t, connection, kind, data]
+
+t is seconds since the recorder started (monotonic clock), connection is a
+small integer per WebSocket connection, and kind is "open" (data is the
+handshake path), "msg" (data is the raw inbound message) or "close".
+"""
+import itertools
+import json
+import logging
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "travi-traffic"
+FORMAT_VERSION = 1
+
+OPEN = "open"
+MESSAGE = "msg"
+CLOSE = "close"
+
+
+class TrafficEvent(NamedTuple):
+    """One recorded inbound event"""
+    t: float
+    connection: int
+    kind: str
+    data: Optional[str]
+
+
+class TrafficRecorder:
+    """Appends every inbound message, per connection, to a recording file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.monotonic()
+        self._ids = itertools.count()
+        # Line-buffered: every event reaches the OS as soon as it is written,
+        # so a crash or SIGKILL loses nothing that was already received
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._write({"format": FORMAT, "version": FORMAT_VERSION, "started": time.time()})
+        logger.info(f"Recording inbound traffic to {path}")
+
+    def _write(self, record) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+
+    def _event(self, connection: int, kind: str, data: Optional[str] = None) -> None:
+        self._write([round(time.monotonic() - self.started, 6), connection, kind, data])
+
+    def open(self, path: str) -> int:
+        """Record a new connection and return its id"""
+        connection = next(self._ids)
+        self._event(connection, OPEN, path)
+        return connection
+
+    def record(self, connection: int, message: str) -> None:
+        """Record one inbound message"""
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", errors="replace")
+        self._event(connection, MESSAGE, message)
+
+    def close(self, connection: int) -> None:
+        """Record a disconnect"""
+        self._event(connection, CLOSE)
+
+    def stop(self) -> None:
+        self._file.close()
+
+
+def read_recording(path: str) -> List[TrafficEvent]:
+    """Load every event of a recording (a truncated last line is skipped)"""
+    return list(iter_recording(path))
+
+
+def iter_recording(path: str) -> Iterator[TrafficEvent]:
+    """Stream events; sessions appended to one file are laid end to end"""
+    connection_base = time_base = 0
+    next_connection = 0
+    last_t = 0.0
+    headers = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable line {line_number} of {path}")
+                continue
+            if isinstance(record, dict):
+                if record.get("format") != FORMAT:
+                    raise ValueError(f"{path} is not a traffic recording")
+                # Each session restarts its clock and connection ids
+                if headers:
+                    connection_base = next_connection
+                    time_base = last_t
+                headers += 1
+                continue
+            t, connection, kind, data = record
+            event = TrafficEvent(t + time_base, connection + connection_base, kind, data)
+            next_connection = max(next_connection, event.connection + 1)
+            last_t = event.t
+            yield event
@@ -0,0 +1,164 @@
+"""Procedural world chunks, generated lazily and streamed to clients
+
+The world is split into square chunks on the XZ plane. A chunk's entities
+are a pure function of (seed, chunk coordinate), so chunks are only
+generated when a client's viewpoint comes near them. Loaded chunks live in
+a bounded LRU cache; chunks nobody is near are simply dropped and
+regenerated if a client returns, which is cheaper than any disk cache and
+keeps disk use flat however far clients explore.
+"""
+import logging
+import math
+import random
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from schema import WORLD_LIMIT
+
+logger = logging.getLogger(__name__)
+
+ChunkCoord = Tuple[int, int]
+
+CHUNK_SIZE = 16.0
+VIEW_RADIUS = 2           # chunks around the viewpoint, in each direction
+MAX_LOADED_CHUNKS = 256
+STREAM_BATCH_SIZE = 4     # chunks per streamed message
+MAX_PROPS_PER_CHUNK = 8
+
+
+def chunk_coord(position: List[float]) -> ChunkCoord:
+    """Chunk containing a world position (clamped to +-WORLD_LIMIT)"""
+    x = max(-WORLD_LIMIT, min(WORLD_LIMIT, position[0]))
+    z = max(-WORLD_LIMIT, min(WORLD_LIMIT, position[2]))
+    return (math.floor(x / CHUNK_SIZE), math.floor(z / CHUNK_SIZE))
+
+
+def chunks_around(center: ChunkCoord, radius: int = VIEW_RADIUS) -> Set[ChunkCoord]:
+    """All chunk coordinates in the square neighbourhood of center"""
+    cx, cz = center
+    return {
+        (x, z)
+        for x in range(cx - radius, cx + radius + 1)
+        for z in range(cz - radius, cz + radius + 1)
+    }
+
+
+def generate_chunk(seed: int, coord: ChunkCoord) -> List[Dict[str, Any]]:
+    """Deterministically generate the entities of one chunk"""
+    cx, cz = coord
+    # Seeding with a string is stable across processes (unlike hash())
+    rng = random.Random(f"{seed}:{cx}:{cz}")
+    origin_x = cx * CHUNK_SIZE
+    origin_z = cz * CHUNK_SIZE
+
+    entities = []
+    for i in range(rng.randint(0, MAX_PROPS_PER_CHUNK)):
+        size = round(rng.uniform(0.5, 2.0), 2)
+        entities.append({
+            "entity_id": f"chunk_{cx}_{cz}_{i}",
+            "type": "cube",
+            "position": [
+                round(origin_x + rng.uniform(0, CHUNK_SIZE), 2),
+                size / 2,
+                round(origin_z + rng.uniform(0, CHUNK_SIZE), 2)
+            ],
+            "rotation": [0, round(rng.uniform(0, math.tau), 2), 0],
+            "scale": [size, size, size],
+            "color": [round(rng.random(), 2), round(rng.random(), 2), round(rng.random(), 2), 1],
+            "meta": {"chunk": [cx, cz]}
+        })
+    return entities
+
+
+class ChunkStore:
+    """LRU cache of generated chunks"""
+
+    def __init__(self, seed: int = 0, max_loaded: int = MAX_LOADED_CHUNKS):
+        self.seed = seed
+        self.max_loaded = max_loaded
+        self.loaded: "OrderedDict[ChunkCoord, List[Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, coord: ChunkCoord) -> List[Dict[str, Any]]:
+        """Entities of a chunk, generating it on first use"""
+        entities = self.loaded.get(coord)
+        if entities is not None:
+            self.loaded.move_to_end(coord)
+            return entities
+
+        entities = generate_chunk(self.seed, coord)
+        self.loaded[coord] = entities
+        return entities
+
+    def evict(self, keep: Set[ChunkCoord]) -> int:
+        """Evict least recently used chunks outside keep down to max_loaded"""
+        evicted = 0
+        if len(self.loaded) <= self.max_loaded:
+            return evicted
+        for coord in list(self.loaded):
+            if len(self.loaded) <= self.max_loaded:
+                break
+            if coord in keep:
+                continue
+            del self.loaded[coord]
+            evicted += 1
+        logger.debug(f"[CHUNKS] evicted {evicted} chunks, {len(self.loaded)} loaded")
+        return evicted
+
+
+class ChunkStreamer:
+    """Tracks which chunks one client needs and streams them in batches"""
+
+    def __init__(self, store: ChunkStore, radius: int = VIEW_RADIUS,
+                 batch_size: int = STREAM_BATCH_SIZE):
+        self.store = store
+        self.radius = radius
+        self.batch_size = batch_size
+        self.wanted: Set[ChunkCoord] = set()
+        self.sent: Set[ChunkCoord] = set()
+        self.pending: List[ChunkCoord] = []
+        self.unloaded: List[ChunkCoord] = []
+
+    def set_viewpoint(self, position: List[float]) -> None:
+        """Recompute the neighbourhood; nearest missing chunks go first"""
+        center = chunk_coord(position)
+        wanted = chunks_around(center, self.radius)
+        if wanted == self.wanted:
+            return
+        self.wanted = wanted
+
+        # Chunks that left and came back before their unload was sent are
+        # still on the client: keep them as sent instead of reloading them
+        rewanted = [coord for coord in self.unloaded if coord in wanted]
+        self.sent.update(rewanted)
+        self.unloaded = [coord for coord in self.unloaded if coord not in wanted]
+
+        dropped = self.sent - wanted
+        self.sent -= dropped
+        self.unloaded.extend(dropped)
+        self.pending = sorted(
+            wanted - self.sent,
+            key=lambda c: (c[0] - center[0]) ** 2 + (c[1] - center[1]) ** 2
+        )
+
+    def next_batch(self) -> Optional[Dict[str, Any]]:
+        """Payload of the next bounded batch, or None when up to date"""
+        if not self.pending and not self.unloaded:
+            return None
+        batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+        self.sent.update(batch)
+        payload = {
+            "chunks": [
+                {"coord": list(coord), "entities": self.store.get(coord)}
+                for coord in batch
+            ],
+            "unloaded": [list(coord) for coord in self.unloaded]
+        }
+        self.unloaded = []
+        return payload
+
+
+def active_chunks(streamers: Iterable[ChunkStreamer]) -> Set[ChunkCoord]:
+    """Union of every client's neighbourhood"""
+    active: Set[ChunkCoord] = set()
+    for streamer in streamers:
+        active |= streamer.wanted
+    return active
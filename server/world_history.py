@@ -0,0 +1,108 @@
+"""Undo/redo, checkpoints and branches for editor sessions"""
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from world_state import WorldState, WorldSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNDO_LIMIT = 256
+
+
+class _Branch:
+    """Head and undo/redo stacks of one what-if branch"""
+    __slots__ = ("head", "undo", "redo")
+
+    def __init__(self, head: WorldSnapshot, limit: int):
+        self.head = head
+        self.undo: Deque[WorldSnapshot] = deque(maxlen=limit)
+        self.redo: List[WorldSnapshot] = []
+
+
+class WorldHistory:
+    """Edit history over a WorldState
+
+    Snapshots share structure with the live world, so every entry here only
+    costs the entities that changed between it and its neighbours.
+    """
+
+    def __init__(self, world_state: WorldState, limit: int = DEFAULT_UNDO_LIMIT):
+        self.world_state = world_state
+        self.limit = limit
+        self.checkpoints: Dict[str, WorldSnapshot] = {}
+        self.branch_name = "main"
+        self._branch = _Branch(world_state.snapshot(), limit)
+        self.branches: Dict[str, _Branch] = {self.branch_name: self._branch}
+
+    def record(self, before: WorldSnapshot) -> bool:
+        """Push the pre-edit snapshot if the world changed since it was taken"""
+        if before.entities is self.world_state.entities:
+            return False
+        self._branch.undo.append(before)
+        self._branch.redo.clear()
+        return True
+
+    def undo(self) -> bool:
+        """Step back one edit on the current branch"""
+        if not self._branch.undo:
+            return False
+        self._branch.redo.append(self.world_state.snapshot())
+        self.world_state.restore(self._branch.undo.pop())
+        logger.info(f"[HISTORY] undo on branch {self.branch_name}")
+        return True
+
+    def redo(self) -> bool:
+        """Re-apply the last undone edit on the current branch"""
+        if not self._branch.redo:
+            return False
+        self._branch.undo.append(self.world_state.snapshot())
+        self.world_state.restore(self._branch.redo.pop())
+        logger.info(f"[HISTORY] redo on branch {self.branch_name}")
+        return True
+
+    def create_checkpoint(self, name: str) -> WorldSnapshot:
+        """Name the current world so it can be restored later"""
+        snapshot = self.world_state.snapshot()
+        self.checkpoints[name] = snapshot
+        logger.info(f"[HISTORY] checkpoint {name} at version {snapshot.version}")
+        return snapshot
+
+    def restore_checkpoint(self, name: str) -> bool:
+        """Restore a named checkpoint as an undoable edit"""
+        snapshot = self.checkpoints.get(name)
+        if snapshot is None:
+            logger.warning(f"Unknown checkpoint: {name}")
+            return False
+        before = self.world_state.snapshot()
+        self.world_state.restore(snapshot)
+        self.record(before)
+        return True
+
+    def create_branch(self, name: str, source: Optional[str] = None) -> bool:
+        """Fork a branch from a checkpoint, or from the current world"""
+        if name in self.branches:
+            logger.warning(f"Branch already exists: {name}")
+            return False
+        if source is not None:
+            head = self.checkpoints.get(source)
+            if head is None:
+                logger.warning(f"Unknown checkpoint: {source}")
+                return False
+        else:
+            head = self.world_state.snapshot()
+        self.branches[name] = _Branch(head, self.limit)
+        logger.info(f"[HISTORY] created branch {name}")
+        return True
+
+    def switch_branch(self, name: str) -> bool:
+        """Park the current branch and make another one live"""
+        branch = self.branches.get(name)
+        if branch is None:
+            logger.warning(f"Unknown branch: {name}")
+            return False
+        self._branch.head = self.world_state.snapshot()
+        self._branch = branch
+        self.branch_name = name
+        self.world_state.restore(branch.head)
+        logger.info(f"[HISTORY] switched to branch {name}")
+        return True
@@ -1,15 +1,128 @@
 """World state management"""
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, Deque, List, Optional, NamedTuple, Tuple
 import logging
+import uuid
+from persistent_map import PersistentMap
+from schema import STAT_VALIDATORS, check_stat
 
 logger = logging.getLogger(__name__)
 
+CHANGE_HISTORY = 1024  # entity changes kept for reconnect catch-up
+
+
+class WorldSnapshot(NamedTuple):
+    """Immutable view of the world at one version"""
+    version: int
+    entities: PersistentMap
+
 
 class WorldState:
-    """Manages the authoritative world state"""
+    """Manages the authoritative world state
+
+    Entities live in a PersistentMap and entity dicts are never mutated in
+    place once stored: every edit stores a fresh copy. Taking a snapshot is
+    therefore O(1) and old snapshots share everything that was not edited.
+    
+    Every change is also appended to a bounded ring tagged with the world
+    version, so reconnecting clients can catch up with changes_since().
+    The epoch identifies this world's version sequence across restarts.
+    
+    Entity ids are also given compact integer handles for the wire. Handles
+    are assigned on first use and never reused, so they stay valid across
+    deletes, undo and branch switches for the lifetime of the process.
+    """
     
-    def __init__(self):
-        self.entities: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, history_size: int = CHANGE_HISTORY):
+        self.entities: PersistentMap = PersistentMap()
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self.changes: Deque[Tuple[int, str, Optional[Dict[str, Any]]]] = deque(maxlen=history_size)
+        # Oldest version a client may hold and still be served from changes
+        self.history_floor = 0
+        self.handles: Dict[str, int] = {}
+        self.handle_ids: List[str] = []
+        
+    def _log_change(self, entity_id: str, entity: Optional[Dict[str, Any]]) -> None:
+        """Record a change (entity None means deleted) at the current version"""
+        if len(self.changes) == self.changes.maxlen:
+            self.history_floor = self.changes[0][0]
+        self.changes.append((self.version, entity_id, entity))
+        
+    def _store(self, entity_id: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace an entity and bump the world version"""
+        self.entities = self.entities.set(entity_id, entity)
+        self.version += 1
+        self._log_change(entity_id, entity)
+        return entity
+        
+    def handle_for(self, entity_id: str) -> int:
+        """Integer handle of an entity id, assigned on first use"""
+        handle = self.handles.get(entity_id)
+        if handle is None:
+            handle = len(self.handle_ids)
+            self.handle_ids.append(entity_id)
+            self.handles[entity_id] = handle
+        return handle
+        
+    def entity_id_for(self, handle: int) -> Optional[str]:
+        """Entity id behind a handle, or None if it was never assigned"""
+        if 0 <= handle < len(self.handle_ids):
+            return self.handle_ids[handle]
+        return None
+        
+    def load(self, entities: Dict[str, Dict[str, Any]], version: int = 0,
+             epoch: Optional[str] = None) -> None:
+        """Replace the whole world, e.g. when resuming a room from disk"""
+        self.entities = PersistentMap(entities)
+        self.version = version
+        if epoch:
+            self.epoch = epoch
+        self.changes.clear()
+        self.history_floor = version
+        
+    def changes_since(self, version: int, epoch: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Collapsed changes after version, or None if a full snapshot is needed"""
+        if epoch != self.epoch or version > self.version or version < self.history_floor:
+            return None
+            
+        updated: Dict[str, Dict[str, Any]] = {}
+        deleted: List[str] = []
+        seen = set()
+        # Walk newest first so only the latest change per entity is kept
+        for change_version, entity_id, entity in reversed(self.changes):
+            if change_version <= version:
+                break
+            if entity_id in seen:
+                continue
+            seen.add(entity_id)
+            if entity is None:
+                deleted.append(entity_id)
+            else:
+                updated[entity_id] = entity
+                
+        return {
+            "since": version,
+            "version": self.version,
+            "epoch": self.epoch,
+            "updated": updated,
+            "deleted": deleted
+        }
+        
+    def snapshot(self) -> WorldSnapshot:
+        """Capture the current world (O(1), structurally shared)"""
+        return WorldSnapshot(self.version, self.entities)
+        
+    def restore(self, snapshot: WorldSnapshot) -> None:
+        """Make a previously captured snapshot the current world"""
+        if snapshot.entities is self.entities:
+            return
+        changed = self.entities.diff(snapshot.entities)
+        self.entities = snapshot.entities
+        self.version += 1
+        for entity_id, _, entity in changed:
+            self._log_change(entity_id, entity)
+        logger.info(f"[STATE] restored snapshot from version {snapshot.version}")
         
     def spawn_entity(self, entity_id: str, entity_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add a new entity to the world"""
@@ -51,8 +164,18 @@ class WorldState:
                 "mode": "follow",
                 "target_id": None
             })
+            
+        # Client-supplied stats follow the same per-type rules as update_stats,
+        # but one bad value rejects the whole spawn before it touches state
+        rules = STAT_VALIDATORS.get(entity_type)
+        if rules is not None and "stats" in entity_data:
+            entity["stats"] = {
+                key: rules.get(key, check_stat)(value)
+                for key, value in entity["stats"].items()
+            }
         
-        self.entities[entity_id] = entity
+        self.handle_for(entity_id)
+        self._store(entity_id, entity)
         logger.info(f"[STATE] Spawned entity: {entity_id} of type: {entity_type}")
         return entity
         
@@ -61,18 +184,18 @@ class WorldState:
         if entity_id not in self.entities:
             logger.warning(f"Attempted to move non-existent entity: {entity_id}")
             return None
-        self.entities[entity_id]["position"] = position
+        entity = dict(self.entities[entity_id], position=position)
         logger.info(f"[STATE] entity {entity_id} mutated position")
-        return self.entities[entity_id]
+        return self._store(entity_id, entity)
         
     def set_color(self, entity_id: str, color: list) -> Optional[Dict[str, Any]]:
         """Update entity color"""
         if entity_id not in self.entities:
             logger.warning(f"Attempted to color non-existent entity: {entity_id}")
             return None
-        self.entities[entity_id]["color"] = color
+        entity = dict(self.entities[entity_id], color=color)
         logger.info(f"[STATE] entity {entity_id} mutated color")
-        return self.entities[entity_id]
+        return self._store(entity_id, entity)
         
     def update_stats(self, entity_id: str, stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update entity stats with validation"""
@@ -83,57 +206,42 @@ class WorldState:
         entity = self.entities[entity_id]
         entity_type = entity.get("type")
         
-        # Only player and pet entities have stats
-        if entity_type not in ["player", "pet"]:
+        # Only entity types with stat rules (player, pet) have stats
+        rules = STAT_VALIDATORS.get(entity_type)
+        if rules is None:
             logger.warning(f"Entity {entity_id} of type {entity_type} does not support stats")
             return None
             
-        if "stats" not in entity:
-            entity["stats"] = {}
+        # Copy-on-write: the stored entity may be shared with snapshots
+        entity = dict(entity)
+        entity["stats"] = dict(entity.get("stats", {}))
             
-        # Validate and update stats
+        # Validate (and clamp) each stat with its precompiled rule
         for key, value in stats.items():
-            # Basic validation: numeric values
-            if not isinstance(value, (int, float)):
-                logger.warning(f"Invalid stat value for {key}: {value}")
+            try:
+                value = rules.get(key, check_stat)(value)
+            except ValueError as e:
+                logger.warning(f"Invalid stat for {entity_type}: {e}")
                 continue
                 
-            # Type-specific validation
-            if entity_type == "player":
-                # Health, stamina, mana cannot be negative
-                if key in ["health", "stamina", "mana"] and value < 0:
-                    logger.warning(f"Player stat {key} cannot be negative")
-                    continue
-                # Level must be at least 1
-                if key == "level" and value < 1:
-                    logger.warning(f"Player level cannot be less than 1")
-                    continue
-                    
-            elif entity_type == "pet":
-                # Health cannot be negative
-                if key == "health" and value < 0:
-                    logger.warning(f"Pet health cannot be negative")
-                    continue
-                # Loyalty is clamped between 0 and 100
-                if key == "loyalty":
-                    value = max(0, min(100, value))
-                    
             entity["stats"][key] = value
             logger.info(f"[STATE] entity {entity_id} mutated stats.{key}")
             
-        return entity
+        return self._store(entity_id, entity)
         
-    def update_pet_behavior(self):
-        """Auto-update pet following behavior"""
-        for entity_id, entity in self.entities.items():
+    def update_pet_behavior(self) -> List[Dict[str, Any]]:
+        """Auto-update pet following behavior, returning the pets that moved"""
+        moved = []
+        entities = self.entities
+        for entity_id, entity in entities.items():
             if entity.get("type") == "pet":
                 behavior = entity.get("behavior", {})
                 target_id = behavior.get("target_id")
                 mode = behavior.get("mode")
                 
-                if mode == "follow" and target_id and target_id in self.entities:
+                if mode == "follow" and target_id and target_id in entities:
                     # Get target position
-                    target_entity = self.entities[target_id]
+                    target_entity = entities[target_id]
                     target_pos = target_entity["position"]
                     
                     # Simple following logic: move pet closer to target
@@ -149,17 +257,20 @@ class WorldState:
                     if dist > 2.0:
                         # Normalize and scale movement
                         factor = (dist - 2.0) / dist * 0.1  # Move 10% of excess distance
-                        entity["position"] = [
+                        moved.append(self._store(entity_id, dict(entity, position=[
                             pet_pos[0] + dx * factor,
                             pet_pos[1] + dy * factor,
                             pet_pos[2] + dz * factor
-                        ]
+                        ])))
                         logger.debug(f"Pet {entity_id} following {target_id}")
+        return moved
         
     def delete_entity(self, entity_id: str) -> bool:
         """Remove an entity from the world"""
         if entity_id in self.entities:
-            del self.entities[entity_id]
+            self.entities = self.entities.delete(entity_id)
+            self.version += 1
+            self._log_change(entity_id, None)
             logger.info(f"Deleted entity: {entity_id}")
             return True
         logger.warning(f"Attempted to delete non-existent entity: {entity_id}")
@@ -170,5 +281,5 @@ class WorldState:
         return self.entities.get(entity_id)
         
     def get_all_entities(self) -> Dict[str, Dict[str, Any]]:
-        """Get all entities"""
-        return self.entities.copy()
+        """Get all entities as a plain dict (stored entities are never mutated)"""
+        return dict(self.entities.items())
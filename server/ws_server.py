@@ -1,95 +1,110 @@
 """WebSocket server for T-R-A-V-I engine"""
-import asyncio
 import websockets
 import logging
-from typing import Set
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit, parse_qs
 from websockets.server import WebSocketServerProtocol
-from world_state import WorldState
-from command_router import CommandRouter
-from messages import (
-    parse_message, create_state_message, create_error_message,
-    MessageType
-)
+from rooms import RoomManager, DEFAULT_ROOM, is_valid_room_name
+from traffic import TrafficRecorder
+from messages import create_error_message
 
 logger = logging.getLogger(__name__)
 
 
+def request_path(websocket: WebSocketServerProtocol) -> str:
+    """Handshake path across websockets versions"""
+    path = getattr(websocket, "path", None)
+    if path is None:
+        path = websocket.request.path
+    return path
+
+
+class Handshake(NamedTuple):
+    """Options a client requests in its connection URL"""
+    room: str
+    since: Optional[int]
+    epoch: Optional[str]
+    compact: bool
+
+
+def parse_handshake(websocket: WebSocketServerProtocol) -> Handshake:
+    """Room, resume point and wire options requested at handshake
+
+    ws://host:port/<room> or ?room=<room>; a reconnecting client adds
+    &since=<version>&epoch=<epoch> from the last message it applied, and
+    &handles=1 opts into handle-based UPDATE messages.
+    """
+    url = urlsplit(request_path(websocket))
+    query = parse_qs(url.query)
+
+    room = query["room"][0] if "room" in query else url.path.strip("/") or DEFAULT_ROOM
+    since = None
+    if "since" in query:
+        try:
+            since = int(query["since"][0])
+        except ValueError:
+            logger.warning(f"Ignoring invalid resume version: {query['since'][0]!r}")
+    epoch = query["epoch"][0] if "epoch" in query else None
+    compact = query.get("handles", ["0"])[0] in ("1", "true")
+    return Handshake(room, since, epoch, compact)
+
+
 class WebSocketServer:
-    """Manages WebSocket connections and message routing"""
+    """Accepts connections and hands each client to its room"""
     
-    def __init__(self, host: str = "localhost", port: int = 8765):
+    def __init__(self, host: str = "localhost", port: int = 8765,
+                 world_seed: int = 0, room_dir: Optional[str] = None,
+                 record_path: Optional[str] = None):
         self.host = host
         self.port = port
-        self.clients: Set[WebSocketServerProtocol] = set()
-        self.world_state = WorldState()
-        self.command_router = CommandRouter(self.world_state)
-        
-    async def register(self, websocket: WebSocketServerProtocol):
-        """Register a new client and send initial state"""
-        self.clients.add(websocket)
-        logger.info(f"Client connected. Total clients: {len(self.clients)}")
-        
-        # Send current world state to new client
-        state_msg = create_state_message(self.world_state.get_all_entities())
-        await websocket.send(state_msg)
-        
-    async def unregister(self, websocket: WebSocketServerProtocol):
-        """Unregister a disconnected client"""
-        self.clients.discard(websocket)
-        logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
+        self.rooms = RoomManager(
+            data_dir=room_dir,
+            world_seed=world_seed
+        )
+        # Opt-in: record all inbound traffic for replay.py
+        self.recorder = TrafficRecorder(record_path) if record_path else None
         
-    async def broadcast(self, message: str):
-        """Broadcast a message to all connected clients"""
-        if self.clients:
-            await asyncio.gather(
-                *[client.send(message) for client in self.clients],
-                return_exceptions=True
-            )
-            
     async def handle_client(self, websocket: WebSocketServerProtocol):
         """Handle messages from a single client"""
-        await self.register(websocket)
-        
+        connection = None
+        if self.recorder:
+            connection = self.recorder.open(request_path(websocket))
+        try:
+            await self.serve_client(websocket, connection)
+        finally:
+            if self.recorder:
+                self.recorder.close(connection)
+                
+    async def serve_client(self, websocket: WebSocketServerProtocol, connection: Optional[int]):
+        """Join the requested room and process messages until disconnect"""
+        handshake = parse_handshake(websocket)
+        if not is_valid_room_name(handshake.room):
+            logger.warning(f"Rejected invalid room name: {handshake.room!r}")
+            await websocket.send(create_error_message(f"Invalid room name: {handshake.room}"))
+            await websocket.close()
+            return
+            
+        room = self.rooms.get_room(handshake.room)
         try:
+            # Inside the try: a client that drops during the initial sends
+            # must still be unregistered, or the room never suspends
+            await room.register(websocket, handshake.since, handshake.epoch, handshake.compact)
             async for message in websocket:
-                await self.process_message(message, websocket)
+                if self.recorder:
+                    self.recorder.record(connection, message)
+                await room.process_message(message, websocket)
         except websockets.exceptions.ConnectionClosed:
             logger.info("Client connection closed")
         finally:
-            await self.unregister(websocket)
-            
-    async def process_message(self, raw_message: str, sender: WebSocketServerProtocol):
-        """Process incoming message and broadcast updates"""
-        try:
-            msg = parse_message(raw_message)
-            msg_type = msg["type"]
-            payload = msg["payload"]
-            
-            if msg_type == MessageType.COMMAND:
-                command = payload.get("command")
-                params = payload.get("params", {})
-                
-                if command:
-                    event_msg = self.command_router.route_command(command, params)
-                    if event_msg:
-                        await self.broadcast(event_msg)
-                    else:
-                        logger.warning(f"Command failed or unknown: {command}")
-                        error_msg = create_error_message(f"Command failed or unknown: {command}")
-                        await sender.send(error_msg)
-                        
-            elif msg_type == MessageType.PING:
-                # Simple ping/pong for connection health
-                pass
-                
-        except ValueError as e:
-            logger.error(f"Invalid message received: {e}")
-            error_msg = create_error_message(str(e))
-            await sender.send(error_msg)
+            await room.unregister(websocket)
             
     async def start(self):
         """Start the WebSocket server"""
         logger.info(f"Starting WebSocket server on {self.host}:{self.port}")
         async with websockets.serve(self.handle_client, self.host, self.port):
             logger.info("WebSocket server is running")
-            await asyncio.Future()  # Run forever
+            try:
+                await self.rooms.janitor_loop()  # Run forever
+            finally:
+                if self.recorder:
+                    self.recorder.stop()